@@ -1,12 +1,22 @@
+import os
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans, DBSCAN
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import silhouette_score
+from sklearn.metrics import silhouette_score, pairwise_distances
 import geopandas as gpd
-import requests
-from io import StringIO
+from columnar_store import is_columnar_path, load_columnar
+from url_ingest import stream_csv_chunks
+from feed_sync import poll_feed, commit_poll
+from geo_export import export_geojson
+from pipeline_profiler import profile_stage, stage
+from model_registry import REGISTRY_DIR, DRIFT_THRESHOLD, load_model, save_model, assignment_distances, \
+    distance_edges, population_stability, align_clusters
+from summary_plot import PLOT_CACHE_DIR, render_summary_plot
 
 """
 backend_processing.py
@@ -19,10 +29,15 @@ Description:
 """
 
 
-def load_data(path): #Loads data from a csv into a dataframe for processing
-    wildfire_df = pd.read_csv(path)
+@profile_stage()
+def load_data(path, chunksize=None, columns=None): #Loads data from a csv into a dataframe for processing
+    # with a chunksize an iterator of dataframes is returned instead, for out-of-core processing
+    if is_columnar_path(path): # converted archives are memory mapped (see columnar_store.py)
+        return load_columnar(path, columns=columns, chunksize=chunksize)
+    wildfire_df = pd.read_csv(path, chunksize=chunksize, usecols=columns)
     return wildfire_df
 
+@profile_stage()
 def preprocess(dataframe): #Sorts the data geographically
     dataframe = dataframe.dropna(subset=['latitude', 'longitude'])
     dataframe = dataframe.sort_values(by=['latitude', 'longitude'])
@@ -33,38 +48,38 @@ def preprocess(dataframe): #Sorts the data geographically
 
     return dataframe
 
-# new -   Creates a scatter plot of Brightness vs FRP (Fire Radiative Power) colored by Risk Level.
-def plot_wildfire_summary(dataframe, output_path="wildfire_summary_plot.png"):
+# new -   Creates a plot of Brightness vs FRP (Fire Radiative Power) colored by Risk Level.
+@profile_stage()
+def plot_wildfire_summary(dataframe, output_path="wildfire_summary_plot.png", mode="auto", cache_dir=PLOT_CACHE_DIR):
+    """
+    Brightness vs FRP plot by risk level. Above DENSITY_THRESHOLD detections (mode="auto")
+    it is drawn as a density raster instead of one marker per point; the PNG is only
+    re-rendered when what it shows changes (see summary_plot.py).
+    """
     if 'brightness' not in dataframe.columns or 'frp' not in dataframe.columns:
         print("Error: Missing required columns 'brightness' and 'frp'. Cannot plot.")
         return
     
     if 'risk_label' not in dataframe.columns:
         # If risk_label isn't there, create it quickly
-        dataframe['risk_label'] = dataframe['brightness'].apply(assign_risk_label)
-    
-    plt.figure(figsize=(10, 6))
-    for label in dataframe['risk_label'].unique():
-        subset = dataframe[dataframe['risk_label'] == label]
-        plt.scatter(subset['brightness'], subset['frp'], label=label, alpha=0.6)
+        dataframe['risk_label'] = classify_risk(dataframe['brightness'])
     
-    plt.xlabel('Brightness')
-    plt.ylabel('Fire Radiative Power (FRP)')
-    plt.title('Wildfire Brightness vs FRP by Risk Level')
-    plt.legend(title="Risk Level")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(output_path)
-    plt.close()
+    render_summary_plot(dataframe['brightness'], dataframe['frp'], dataframe['risk_label'], output_path,
+                        mode=mode, cache_dir=cache_dir)
     print(f"Wildfire summary plot saved to {output_path}")
 
 # new function - cluster summary statistics - compuytes avg values for each cluster
-def get_cluster_summary(dataframe):
+@profile_stage()
+def get_cluster_summary(dataframe, include_noise=False):
     if 'intensity_score' not in dataframe.columns:
         dataframe['intensity_score'] = (dataframe['brightness'] * 0.6 + dataframe['frp'] * 0.4).round(2)
 
+    # DBSCAN noise (-1) is scattered detections, not a cluster, so it has no summary row
+    # unless asked for (the archive keeps it to count every detection of a day)
+    grouped = dataframe if include_noise else dataframe[dataframe['cluster_mapping'].to_numpy() >= 0]
+
     # groupby
-    summary = dataframe.groupby("cluster_mapping").agg({
+    summary = grouped.groupby("cluster_mapping").agg({
         "brightness": "mean",
         "frp": "mean",
         "intensity_score": "mean"
@@ -80,10 +95,17 @@ def get_cluster_summary(dataframe):
     return summary
 
 
+@profile_stage()
 def convert_geodata(dataframe): #Convert this to a usable dataframe format for displaying
     geo_df = gpd.GeoDataFrame(dataframe, geometry=gpd.points_from_xy(dataframe.longitude, dataframe.latitude), crs='EPSG:4326')
     return geo_df
 
+EARTH_RADIUS_KM = 6371.0088
+
+# Thresholds/labels shared by the backend and the dashboard for risk classification
+RISK_LABELS = ["Low Risk", "Medium Risk", "High Risk"]
+DEFAULT_RISK_THRESHOLDS = (200, 400)
+
 # added a risk label helper function
 def assign_risk_label(brightness):
     if brightness >= 400:
@@ -93,95 +115,603 @@ def assign_risk_label(brightness):
     else:
         return "Low Risk"
     
+def classify_risk(values, thresholds=DEFAULT_RISK_THRESHOLDS, labels=RISK_LABELS):
+    """
+    Array based version of assign_risk_label. Each value is given the index of the
+    highest threshold it reaches (value >= threshold), so NaN falls into the lowest label
+    just like the scalar helper. Returns an ordered pandas Categorical.
+    values: array-like of numbers, thresholds: ascending cut points, labels: len(thresholds) + 1 names
+    """
+    if len(labels) != len(thresholds) + 1:
+        raise ValueError("labels must have exactly one more entry than thresholds")
+    values = np.asarray(values, dtype=float)
+    codes = np.zeros(values.shape, dtype=np.int8)
+    for threshold in thresholds:
+        codes += values >= threshold
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+def classify_risk_frame(dataframe, rules=None, labels=RISK_LABELS):
+    """
+    Labels every row of the dataframe in one pass.
+    rules (dict): column name -> ascending thresholds, e.g.
+        {'brightness': (200, 400), 'frp': (50, 150), 'confidence': (50, 80)}
+    A row gets the highest risk level reached by any of the rule columns present
+    in the dataframe. Defaults to the brightness-only thresholds used everywhere else.
+    """
+    if rules is None:
+        rules = {'brightness': DEFAULT_RISK_THRESHOLDS}
+    codes = np.zeros(len(dataframe), dtype=np.int8)
+    for column, thresholds in rules.items():
+        if column not in dataframe.columns:
+            continue
+        column_codes = classify_risk(pd.to_numeric(dataframe[column], errors='coerce'), thresholds, labels).codes
+        np.maximum(codes, column_codes, out=codes)
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+def cluster_risk_labels(dataframe, thresholds=DEFAULT_RISK_THRESHOLDS, labels=RISK_LABELS):
+    """
+    Labels every row with the risk of its cluster, judged from the cluster's mean
+    brightness (the dashboard's view of risk). Each cluster is classified once and
+    the result is broadcast to the rows. DBSCAN noise (-1) belongs to no cluster, so
+    those rows are judged on their own brightness.
+    """
+    noise = dataframe['cluster_mapping'].to_numpy() < 0
+    clustered = dataframe[~noise]
+    cluster_brightness = clustered.groupby('cluster_mapping', observed=True)['brightness'].mean()
+    cluster_labels = classify_risk(cluster_brightness.values, thresholds, labels)
+    row_codes = np.empty(len(dataframe), dtype=cluster_labels.codes.dtype)
+    row_codes[~noise] = cluster_labels.codes[cluster_brightness.index.get_indexer(clustered['cluster_mapping'])]
+    row_codes[noise] = classify_risk(dataframe['brightness'].to_numpy()[noise], thresholds, labels).codes
+    return pd.Categorical.from_codes(row_codes, dtype=cluster_labels.dtype)
+
 # new - created a cluster color mapping function
+NOISE_COLOR = (140, 140, 140) # DBSCAN noise (-1), kept apart from the cluster colors
+
+def cluster_palette(n_colors, alpha=160):
+    """
+    (n_colors, 4) uint8 RGBA palette: the 20 tab20 colors repeated, so color i is the same
+    whatever n_colors is. Shared by the backend and the dashboard so a cluster gets the
+    same color everywhere.
+    """
+    rgb = (np.array(plt.get_cmap('tab20').colors) * 255).astype(np.uint8)
+    rgb = rgb[np.arange(n_colors) % len(rgb)]
+    return np.column_stack([rgb, np.full(n_colors, alpha, dtype=np.uint8)])
+
+def cluster_rgba(cluster_ids, alpha=160):
+    """
+    (n, 4) uint8 RGBA color of each integer cluster id: the palette entry of the id itself
+    (id % 20), so a cluster keeps its color when other ids are missing or k changes.
+    Negative ids (DBSCAN noise) get NOISE_COLOR.
+    """
+    cluster_ids = np.asarray(cluster_ids, dtype=np.int64)
+    colors = cluster_palette(20, alpha)[np.maximum(cluster_ids, 0) % 20]
+    colors[cluster_ids < 0, :3] = NOISE_COLOR
+    return colors
+
 def generate_cluster_colors(cluster_ids):
-    import matplotlib.pyplot as plt
-    num_clusters = len(cluster_ids)
-    color_map = plt.get_cmap('tab20', num_clusters)
+    try:
+        colors = cluster_rgba([int(cluster) for cluster in cluster_ids])
+    except (TypeError, ValueError): # ids that are not numbers are colored by position
+        colors = cluster_palette(len(cluster_ids))
     cluster_colors = {
-        str(cluster): [int(c * 255) for c in color_map(i)[:3]] + [160]
+        str(cluster): [int(c) for c in colors[i]]
         for i, cluster in enumerate(cluster_ids)
     }
     return cluster_colors
 
-def run_model(dataframe, clusters=10, scale_features=True): #Machine learning model that will cluster the wildfire data and should provide some insight on similarities
-    coordinates = dataframe[['latitude', 'longitude']].values
+def cluster_color_column(cluster_mapping):
+    """
+    Per-row RGBA colors stored compactly: a categorical whose categories are the palette
+    colors (as tuples), so each row costs one small integer code instead of a Python list.
+    Serialises to [r, g, b, a] lists for pydeck and JSON like the old list column.
+    """
+    unique_clusters, cluster_codes = np.unique(np.asarray(cluster_mapping), return_inverse=True)
+    # tab20 repeats past 20 clusters, categories have to be unique
+    colors, color_codes = np.unique(cluster_rgba(unique_clusters), axis=0, return_inverse=True)
+    categories = pd.Index([tuple(int(c) for c in color) for color in colors], tupleize_cols=False)
+    codes = color_codes.reshape(-1)[cluster_codes].astype(np.int16 if len(colors) > 127 else np.int8)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+def _silhouette_values(points, point_labels, coordinates, labels, n_labels, working_memory_mb=64, metric="euclidean",
+                       block_rows=512):
+    # Exact silhouette value of each point against coordinates, computed in tiles of at most
+    # block_rows points x enough reference columns to fill working_memory_mb. The reference
+    # is grouped by cluster once, so each tile's distances are summed straight into their
+    # cluster and no (n x n_labels) indicator matrix is needed
+    counts = np.bincount(labels, minlength=n_labels).astype(float)
+    order = np.argsort(labels, kind="stable")
+    reference = coordinates[order]
+    bounds = np.concatenate(([0], np.cumsum(counts).astype(np.int64)))
+    block_rows = max(1, min(block_rows, len(points)))
+    block_cols = max(64, int(working_memory_mb * 2**20 // (8 * block_rows)))
+    values = np.empty(len(points))
+    for start in range(0, len(points), block_rows):
+        stop = min(start + block_rows, len(points))
+        cluster_sums = np.zeros((stop - start, n_labels))
+        for cluster in np.flatnonzero(counts):
+            for col in range(bounds[cluster], bounds[cluster + 1], block_cols):
+                col_stop = min(col + block_cols, bounds[cluster + 1])
+                cluster_sums[:, cluster] += pairwise_distances(points[start:stop], reference[col:col_stop],
+                                                               metric=metric).sum(axis=1)
+        own = point_labels[start:stop]
+        rows = np.arange(stop - start)
+        own_counts = counts[own]
+        a = cluster_sums[rows, own] / np.maximum(own_counts - 1, 1)
+        mean_other = cluster_sums / np.where(counts > 0, counts, np.inf)
+        mean_other[rows, own] = np.inf
+        mean_other[:, counts == 0] = np.inf
+        b = mean_other.min(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s = (b - a) / np.maximum(a, b)
+        # singleton clusters score 0, matching sklearn
+        values[start:stop] = np.where(own_counts > 1, np.nan_to_num(s), 0.0)
+    return values
+
+@profile_stage()
+def score_clustering(coordinates, labels, mode="auto", sample_size=10000, random_state=9, working_memory_mb=64, metric="euclidean"):
+    """
+    Silhouette score of a clustering with a choice of cost.
+    mode (str):
+        'full'    - sklearn silhouette_score on the whole matrix (O(n^2) memory)
+        'chunked' - exact score computed in blocks with bounded memory
+        'sample'  - seeded, stratified-by-cluster sample scored against itself (like sklearn's
+                    sample_size, so the cost depends on sample_size and not on n)
+        'auto'    - 'full' up to sample_size rows, 'sample' above that
+        None      - skip scoring
+    metric (str): distance passed to sklearn, e.g. 'haversine' for [lat, lon] in radians.
+    Returns a dict with the score, the mode used, the number of points scored and
+    a 95% confidence interval (equal to the score for exact modes), or None when skipped.
+    """
+    if mode is None or mode == "skip":
+        return None
+    coordinates = np.asarray(coordinates, dtype=float)
+    unique_labels, labels = np.unique(np.asarray(labels), return_inverse=True)
+    n = len(labels)
+    if not 2 <= len(unique_labels) <= n - 1:
+        print("Silhouette score needs between 2 and n - 1 clusters, skipping.")
+        return None
+    if mode == "auto":
+        mode = "full" if n <= sample_size else "sample"
+
+    if mode == "full":
+        score = float(silhouette_score(coordinates, labels, metric=metric))
+        return {"score": score, "mode": mode, "n": n, "ci_low": score, "ci_high": score}
+    if mode == "chunked":
+        values = _silhouette_values(coordinates, labels, coordinates, labels, len(unique_labels), working_memory_mb, metric)
+        score = float(values.mean())
+        return {"score": score, "mode": mode, "n": n, "ci_low": score, "ci_high": score}
+    if mode != "sample":
+        raise ValueError(f"Unknown silhouette mode: {mode}")
+
+    # Proportional allocation per cluster, at least two points from every cluster so no
+    # cluster is a singleton inside the sample only
+    rng = np.random.default_rng(random_state)
+    counts = np.bincount(labels)
+    per_cluster = np.minimum(counts, np.maximum(2, np.round(counts * min(sample_size, n) / n).astype(int)))
+    order = np.argsort(labels, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    sample_idx = np.concatenate([
+        rng.choice(order[start:start + count], size=take, replace=False)
+        for start, count, take in zip(starts, counts, per_cluster)
+    ])
+    sample_points, sample_labels = coordinates[sample_idx], labels[sample_idx]
+    values = _silhouette_values(sample_points, sample_labels, sample_points, sample_labels, len(unique_labels),
+                                working_memory_mb, metric)
+    m = len(values)
+    score = float(values.mean())
+    # normal approximation with finite population correction
+    fpc = np.sqrt((n - m) / (n - 1)) if n > 1 else 0.0
+    half_width = 1.96 * values.std(ddof=1) / np.sqrt(m) * fpc if m > 1 else 0.0
+    return {"score": score, "mode": mode, "n": m, "ci_low": score - half_width, "ci_high": score + half_width}
+
+def _fit_k_block(coordinates, sample, k_values, random_state):
+    # Fits consecutive k in one worker; every fit after the first is warm-started from the
+    # previous solution plus the point that is currently worst served by it
+    results = []
+    previous = None
+    for k in k_values:
+        started = time.perf_counter()
+        if previous is None or len(previous.cluster_centers_) != k - 1:
+            model = KMeans(n_clusters=k, random_state=random_state)
+        else:
+            distances = pairwise_distances(coordinates, previous.cluster_centers_).min(axis=1)
+            init = np.vstack([previous.cluster_centers_, coordinates[distances.argmax()]])
+            model = KMeans(n_clusters=k, init=init, n_init=1, random_state=random_state)
+        model.fit(coordinates)
+        sample_labels = model.predict(sample)
+        score = float(silhouette_score(sample, sample_labels)) if 2 <= len(np.unique(sample_labels)) < len(sample) else np.nan
+        results.append({"k": k, "silhouette": score, "inertia": float(model.inertia_),
+                        "fit_seconds": time.perf_counter() - started, "model": model})
+        previous = model
+    return results
+
+@profile_stage()
+def select_cluster_count(coordinates, k_range=range(2, 21), sample_size=2000, n_jobs=None, random_state=9):
+    """
+    Sweeps k over k_range with KMeans and picks the best number of clusters.
+    The range is split into contiguous blocks that run in parallel worker processes, and
+    inside a block each fit is warm-started from the k - 1 solution. Every k is scored on
+    the same seeded sample (silhouette) and on the full data (inertia).
+    coordinates: already scaled feature matrix
+    n_jobs (int): worker processes, defaults to the CPU count; 1 runs in-process
+    Returns (best_model, curve) where curve is a dataframe of k, silhouette, inertia,
+    fit_seconds and an 'elbow' flag marking the knee of the inertia curve.
+    """
+    coordinates = np.asarray(coordinates, dtype=float)
+    k_values = [k for k in k_range if 2 <= k < len(coordinates)]
+    if not k_values:
+        raise ValueError("Need more detections than clusters to choose k")
+    rng = np.random.default_rng(random_state)
+    sample = coordinates if len(coordinates) <= sample_size else coordinates[rng.choice(len(coordinates), sample_size, replace=False)]
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(k_values))
+    blocks = [list(block) for block in np.array_split(k_values, n_jobs) if len(block)]
+    if n_jobs == 1:
+        results = _fit_k_block(coordinates, sample, blocks[0], random_state)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [pool.submit(_fit_k_block, coordinates, sample, block, random_state) for block in blocks]
+            results = [result for future in futures for result in future.result()]
+
+    curve = pd.DataFrame([{key: value for key, value in result.items() if key != "model"} for result in results])
+    # elbow: point of the normalised inertia curve farthest below the chord from first to last k
+    inertia = curve["inertia"].to_numpy()
+    span = inertia[0] - inertia[-1]
+    if len(curve) > 2 and span > 0:
+        x = (curve["k"] - curve["k"].iloc[0]) / (curve["k"].iloc[-1] - curve["k"].iloc[0])
+        y = (inertia - inertia[-1]) / span
+        curve["elbow"] = np.arange(len(curve)) == np.argmax((1 - x) - y)
+    else:
+        curve["elbow"] = False
+    best = int(curve["silhouette"].fillna(-1).idxmax())
+    print(f"Auto cluster selection: best k={curve['k'][best]} (silhouette {curve['silhouette'][best]:.3f})")
+    return results[best]["model"], curve
+
+@profile_stage()
+def run_model(dataframe, clusters=10, scale_features=True, risk_rules=None, silhouette="auto", silhouette_sample_size=10000,
+              k_range=range(2, 21), n_jobs=None): #Machine learning model that will cluster the wildfire data and should provide some insight on similarities
+    # clusters="auto" sweeps k_range in parallel (select_cluster_count); the score curve is kept as records in dataframe.attrs['k_scores']
+    coordinates = dataframe[['latitude', 'longitude']].to_numpy(dtype=np.float64)
     if scale_features:
         scaler = StandardScaler()
         coordinates_scaled = scaler.fit_transform(coordinates)
     else:
+        scaler = None
         coordinates_scaled = coordinates
-    new_model = KMeans(n_clusters=clusters, random_state=9)
-    dataframe['cluster_mapping'] = new_model.fit_predict(coordinates_scaled)
+    if clusters == "auto":
+        new_model, curve = select_cluster_count(coordinates_scaled, k_range=k_range, n_jobs=n_jobs)
+        dataframe['cluster_mapping'] = new_model.labels_
+        dataframe.attrs['k_scores'] = curve.to_dict('records')
+    else:
+        with stage("kmeans_fit", rows_in=len(coordinates_scaled)):
+            new_model = KMeans(n_clusters=clusters, random_state=9)
+            dataframe['cluster_mapping'] = new_model.fit_predict(coordinates_scaled)
 
     #compute sillohuette score to determine the best number of clusters
-    score = silhouette_score(coordinates_scaled, dataframe['cluster_mapping'])
-    print("KMeans Silhouette Score:", score)
+    # (sampled above silhouette_sample_size rows, silhouette=None skips it entirely)
+    score_details = score_clustering(coordinates_scaled, dataframe['cluster_mapping'].values,
+                                     mode=silhouette, sample_size=silhouette_sample_size)
+    score = _finish_clustering(dataframe, score_details, risk_rules)
+    new_model.scaler_ = scaler # kept with the model so saved models can predict on raw coordinates
+    return dataframe, new_model, score
 
-     # new - risk labels 
-    dataframe['risk_label'] = dataframe['brightness'].apply(assign_risk_label)
+def _training_window(dataframe):
+    for column in ('acq_datetime', 'acq_date'):
+        if column in dataframe.columns and len(dataframe):
+            values = pd.Series(dataframe[column]).astype(str)
+            return {"start": values.min(), "end": values.max()}
+    return None
 
-    # new - cluster color mapping
-    unique_clusters = sorted(dataframe['cluster_mapping'].unique())
-    cluster_colors = generate_cluster_colors(unique_clusters)
-    dataframe['color'] = dataframe['cluster_mapping'].astype(str).map(cluster_colors)
-    
+@profile_stage()
+def run_model_registered(dataframe, clusters=10, scale_features=True, registry_dir=REGISTRY_DIR, drift_threshold=DRIFT_THRESHOLD,
+                         refit=False, risk_rules=None, silhouette="auto", silhouette_sample_size=10000):
+    """
+    run_model backed by the model registry (see model_registry.py).
+    With a saved model of the same k and scaling, detections are only assigned with predict
+    against the saved centroids. A full fit runs when there is no usable model, when refit=True,
+    or when the PSI of the assignment distances against the training distribution passes
+    drift_threshold; the new clusters are renumbered to match the previous centroids and saved.
+    dataframe.attrs['model'] records the version used, the drift and whether it was refit.
+    Returns (dataframe, model, score) like run_model.
+    """
+    previous, metadata = load_model(registry_dir)
+    reason = "initial"
+    if previous is not None:
+        reason = "forced"
+        usable = clusters in ("auto", metadata["k"]) and metadata["scale_features"] == scale_features
+        if usable and not refit:
+            coordinates = dataframe[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+            scaler = getattr(previous, 'scaler_', None)
+            coordinates_scaled = scaler.transform(coordinates) if scaler is not None else coordinates
+            labels, distances = assignment_distances(previous, coordinates_scaled)
+            drift = population_stability(metadata["distance_edges"], distances)
+            if drift <= drift_threshold:
+                dataframe['cluster_mapping'] = labels
+                dataframe.attrs['model'] = {"version": metadata["version"], "drift": drift, "refit": False}
+                score_details = score_clustering(coordinates_scaled, labels, mode=silhouette, sample_size=silhouette_sample_size)
+                score = _finish_clustering(dataframe, score_details, risk_rules)
+                return dataframe, previous, score
+            print(f"Assignment distance drift {drift:.3f} is above {drift_threshold}, refitting the model.")
+            reason = "drift"
+        elif not usable:
+            reason = "parameters changed"
+
+    dataframe, new_model, score = run_model(dataframe, clusters=clusters, scale_features=scale_features, risk_rules=risk_rules,
+                                            silhouette=silhouette, silhouette_sample_size=silhouette_sample_size)
+    if previous is not None:
+        mapping = align_clusters(new_model, previous)
+        # renumbered to the previous ids, so colors stay with the same fires
+        dataframe['cluster_mapping'] = pd.to_numeric(mapping[dataframe['cluster_mapping'].to_numpy()], downcast='integer')
+        dataframe['color'] = cluster_color_column(dataframe['cluster_mapping'])
+    coordinates = dataframe[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+    coordinates_scaled = new_model.scaler_.transform(coordinates) if new_model.scaler_ is not None else coordinates
+    _, distances = assignment_distances(new_model, coordinates_scaled)
+    saved = save_model(new_model, {
+        "k": int(new_model.n_clusters),
+        "scale_features": scale_features,
+        "silhouette": score,
+        "rows": int(len(dataframe)),
+        "training_window": _training_window(dataframe),
+        "distance_edges": distance_edges(distances),
+        "distance_mean": float(distances.mean()),
+        "reason": reason,
+        "previous_version": metadata["version"] if metadata else None,
+    }, registry_dir)
+    dataframe.attrs['model'] = {"version": saved["version"], "drift": None, "refit": True}
     return dataframe, new_model, score
 
-def auto_update_and_train(url, clusters=10, scale_features=True, output_geojson="processed_wildfire_usable.json"):
+@profile_stage()
+def run_model_geodesic(dataframe, eps_km=25, min_samples=5, risk_rules=None, silhouette="auto", silhouette_sample_size=10000):
+    """
+    Density based alternative to run_model that works on great-circle distances.
+    DBSCAN runs on [lat, lon] in radians with the haversine metric over a BallTree, so
+    neighbour queries are O(n log n) and no fixed number of clusters is needed.
+    eps_km (float): neighbourhood radius in kilometres
+    min_samples (int): detections needed within eps_km to form a cluster core
+    Noise points get cluster_mapping -1 and are left out of the silhouette score.
+    Returns (dataframe, model, score) like run_model.
+    """
+    coordinates = np.radians(dataframe[['latitude', 'longitude']].values)
+    new_model = DBSCAN(eps=eps_km / EARTH_RADIUS_KM, min_samples=min_samples,
+                       metric='haversine', algorithm='ball_tree')
+    with stage("dbscan_fit", rows_in=len(coordinates)):
+        dataframe['cluster_mapping'] = new_model.fit_predict(coordinates)
+
+    clustered = dataframe['cluster_mapping'].values != -1
+    score_details = score_clustering(coordinates[clustered], dataframe['cluster_mapping'].values[clustered],
+                                     mode=silhouette, sample_size=silhouette_sample_size, metric='haversine')
+    score = _finish_clustering(dataframe, score_details, risk_rules, engine="DBSCAN")
+    return dataframe, new_model, score
+
+def _finish_clustering(dataframe, score_details, risk_rules=None, engine="KMeans"):
+    # Shared tail of the clustering engines: report the score, add risk labels and colors
+    dataframe.attrs['silhouette'] = score_details
+    score = score_details["score"] if score_details is not None else None
+    if score_details is not None:
+        print(f"{engine} Silhouette Score: {score} ({score_details['mode']}, n={score_details['n']}, "
+              f"95% CI {score_details['ci_low']:.3f}-{score_details['ci_high']:.3f})")
+
+     # new - risk labels (vectorized, see classify_risk_frame for the rule format)
+    if risk_rules is not None or 'brightness' in dataframe.columns:
+        dataframe['risk_label'] = classify_risk_frame(dataframe, rules=risk_rules)
+
+    # new - cluster color mapping, as small-int cluster codes and a palette-backed color column
+    dataframe['cluster_mapping'] = pd.to_numeric(dataframe['cluster_mapping'], downcast='integer')
+    dataframe['color'] = cluster_color_column(dataframe['cluster_mapping'])
+    return score
+
+def spool_chunks(chunks, directory=None):
+    """
+    Writes an iterable of raw dataframes to a temporary CSV, one chunk at a time, so a
+    stream that can only be read once (e.g. a download) can be passed over twice by
+    run_model_incremental without holding it in memory. Returns the path; the caller removes it.
+    """
+    handle, path = tempfile.mkstemp(suffix=".csv", dir=directory)
+    try:
+        with os.fdopen(handle, "w", newline="") as spool:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(spool, header=i == 0, index=False)
+    except BaseException:
+        os.remove(path) # e.g. the download failed halfway
+        raise
+    return path
+
+def _chunk_source(source, chunksize):
+    # Returns a function that yields preprocessed chunks and can be called once per pass
+    if isinstance(source, str):
+        return lambda: (preprocess(chunk) for chunk in load_data(source, chunksize=chunksize))
+    chunks = [preprocess(chunk) for chunk in source]
+    return lambda: iter(chunks)
+
+@profile_stage()
+def fit_incremental(chunks, clusters=10, scale_features=True, model=None, scaler=None, random_state=9):
+    """
+    Streams chunks of preprocessed detections into a MiniBatchKMeans model.
+    The StandardScaler keeps running moments (partial_fit), so an existing model and scaler
+    can be passed back in to absorb a new 24h file without refitting the history.
+    chunks: callable returning an iterator of dataframes (called once for the scaler and
+        once for the model), or a list of dataframes.
+    Returns (model, scaler); scaler is None when scale_features is False.
+    """
+    make_chunks = chunks if callable(chunks) else (lambda: iter(chunks))
+    if not scale_features:
+        scaler = None
+    elif model is None:
+        # fresh fit: accumulate the running moments over every chunk before clustering;
+        # an existing model keeps its scaler frozen so its centroids stay in the same space
+        scaler = scaler if scaler is not None else StandardScaler()
+        for chunk in make_chunks():
+            if len(chunk):
+                scaler.partial_fit(chunk[['latitude', 'longitude']].to_numpy(dtype=np.float64))
+    if model is None:
+        model = MiniBatchKMeans(n_clusters=clusters, random_state=random_state, n_init=3)
+
+    # MiniBatchKMeans needs at least n_clusters rows in its first batch, so small chunks are buffered
+    pending = []
+    pending_rows = 0
+    for chunk in make_chunks():
+        coordinates = chunk[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+        if len(coordinates) == 0:
+            continue
+        if scaler is not None:
+            coordinates = scaler.transform(coordinates)
+        pending.append(coordinates)
+        pending_rows += len(coordinates)
+        if pending_rows >= model.n_clusters:
+            model.partial_fit(np.vstack(pending))
+            pending, pending_rows = [], 0
+    if pending_rows:
+        if not hasattr(model, 'cluster_centers_') and pending_rows < model.n_clusters:
+            raise ValueError(f"Need at least {model.n_clusters} detections to fit {model.n_clusters} clusters")
+        model.partial_fit(np.vstack(pending))
+    return model, scaler
+
+@profile_stage()
+def run_model_incremental(source, clusters=10, scale_features=True, chunksize=100000, model=None, scaler=None,
+                          risk_rules=None, silhouette="sample", silhouette_sample_size=10000):
+    """
+    Out-of-core counterpart of run_model with the same (dataframe, model, score) contract.
+    source: CSV path (read chunksize rows at a time) or an iterable of raw dataframes.
+    Fitting a path holds one chunk in memory at a time; only the labeled output is materialised.
+    An iterable is kept in memory for the two passes, spool it with spool_chunks when it is large.
+    The fitted scaler is kept on the returned model as model.scaler_ so later files can be
+    folded in with fit_incremental(..., model=model, scaler=model.scaler_).
+    """
+    make_chunks = _chunk_source(source, chunksize)
+    model, scaler = fit_incremental(make_chunks, clusters=clusters, scale_features=scale_features,
+                                    model=model, scaler=scaler)
+    model.scaler_ = scaler
+
+    labeled = []
+    for chunk in make_chunks():
+        coordinates = chunk[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+        if len(coordinates) == 0:
+            continue
+        if scaler is not None:
+            coordinates = scaler.transform(coordinates)
+        chunk = chunk.copy()
+        chunk['cluster_mapping'] = model.predict(coordinates).astype(np.int32)
+        labeled.append(chunk)
+    dataframe = pd.concat(labeled).sort_values(by=['latitude', 'longitude'])
+
+    coordinates = dataframe[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+    if scaler is not None:
+        coordinates = scaler.transform(coordinates)
+    score_details = score_clustering(coordinates, dataframe['cluster_mapping'].values,
+                                     mode=silhouette, sample_size=silhouette_sample_size)
+    score = _finish_clustering(dataframe, score_details, risk_rules, engine="MiniBatchKMeans")
+    return dataframe, model, score
+
+@profile_stage()
+def auto_update_and_train(url, clusters=10, scale_features=True, output_geojson="processed_wildfire_usable.json", silhouette="auto", chunksize=None, eps_km=None,
+                          state_dir=None, as_geodataframe=True, registry_dir=None):
     """
     Automatically pulls a new dataset from the given URL, processes the data,
     trains the KMeans model, and outputs a GeoJSON file along with the model's outputs
-    url (str): URL pointing to the CSV dataset.
+    url (str): URL pointing to the CSV dataset (http(s) or file://, optionally gzip compressed).
+    silhouette (str): scoring mode passed to score_clustering, None skips scoring on production refreshes.
+    chunksize (int): when given, the CSV is parsed in chunks and clustered with run_model_incremental.
+    eps_km (float): when given, clusters with run_model_geodesic instead of KMeans.
+    state_dir (str): when given, the request is conditional and only detections not seen in earlier
+        polls are processed (see feed_sync.py). Returns None for every output when nothing is new.
+    output_geojson (str): where the GeoJSON is written, None to leave the export to the caller.
+    as_geodataframe (bool): return a GeoDataFrame with point geometries; False skips building them.
+    registry_dir (str): when given, KMeans runs through run_model_registered: the saved model is
+        reused with predict and only refit when the data drifts (see model_registry.py).
     """
+    pending = None
     try:
-        response = requests.get(url)
-        response.raise_for_status()  
-        data_string = response.content.decode('utf-8')
-        wildfire_df = pd.read_csv(StringIO(data_string))
+        if state_dir:
+            wildfire_df, pending = poll_feed(url, state_dir=state_dir, chunksize=chunksize or 100000)
+            if wildfire_df is not None and wildfire_df.empty:
+                commit_poll(state_dir, pending) # only duplicates, remember the new validators
+            # "auto" sweeps k from 2 (run_model's k_range), so two rows are enough to start
+            min_rows = 2 if eps_km or clusters == "auto" else clusters
+            if wildfire_df is None or len(wildfire_df) < min_rows:
+                # unchanged feed, or too few new rows to cluster yet (they stay pending for the next poll)
+                print("No new detections to process.")
+                return None, None, None, None
+            wildfire_df = [wildfire_df] if chunksize else wildfire_df
+        else:
+            # streamed straight into the CSV parser, one chunk in memory at a time (see url_ingest.py);
+            # chunked runs spool the stream to a temporary file that the two fitting passes re-read
+            wildfire_df = stream_csv_chunks(url, chunksize=chunksize or 100000)
+            wildfire_df = spool_chunks(wildfire_df) if chunksize else pd.concat(wildfire_df, ignore_index=True)
         print("New dataset downloaded and loaded successfully.")
     except Exception as e:
         print("Failed to download new dataset:", e)
         return None, None, None, None
 
-    wildfire_df = preprocess(wildfire_df)
-    cluster_df, wildfire_model, score = run_model(wildfire_df, clusters=clusters, scale_features=scale_features)
-    geo_wildfire_df = convert_geodata(cluster_df)
-    geo_wildfire_df["latitude"] = geo_wildfire_df.geometry.y
-    geo_wildfire_df["longitude"] = geo_wildfire_df.geometry.x
-
+    if chunksize:
+        try:
+            cluster_df, wildfire_model, score = run_model_incremental(wildfire_df, clusters=clusters, scale_features=scale_features,
+                                                                      chunksize=chunksize, silhouette=silhouette)
+        finally:
+            if isinstance(wildfire_df, str):
+                os.remove(wildfire_df)
+    elif eps_km:
+        wildfire_df = preprocess(wildfire_df)
+        cluster_df, wildfire_model, score = run_model_geodesic(wildfire_df, eps_km=eps_km, silhouette=silhouette)
+    elif registry_dir:
+        wildfire_df = preprocess(wildfire_df)
+        cluster_df, wildfire_model, score = run_model_registered(wildfire_df, clusters=clusters, scale_features=scale_features,
+                                                                 registry_dir=registry_dir, silhouette=silhouette)
+    else:
+        wildfire_df = preprocess(wildfire_df)
+        cluster_df, wildfire_model, score = run_model(wildfire_df, clusters=clusters, scale_features=scale_features, silhouette=silhouette)
     cluster_stats = get_cluster_summary(cluster_df)
 
-    geo_wildfire_df.to_file(output_geojson, driver='GeoJSON')
-    print("Output GeoJSON saved to", output_geojson)
+    # written straight from the coordinate arrays (see geo_export.py), no GeoDataFrame needed
+    if output_geojson:
+        export_geojson(cluster_df, output_geojson)
+        print("Output GeoJSON saved to", output_geojson)
+    geo_wildfire_df = convert_geodata(cluster_df) if as_geodataframe else cluster_df
+    if state_dir:
+        commit_poll(state_dir, pending)
     
     return geo_wildfire_df, wildfire_model, score, cluster_stats
 
-def load_water_resources(filepath, max_sites=2000):
-    df = pd.read_csv(filepath)
-    df = df[['name', 'latitude', 'longitude']].dropna()
-    df = df.head(max_sites)
+def load_water_resources(filepath, max_sites=None):
+    # every site is kept by default, lookups go through the spatial index in water_index.py
+    df = pd.read_csv(filepath, usecols=['name', 'latitude', 'longitude'])
+    df = df.dropna()
+    df = df[df['latitude'].between(-90, 90) & df['longitude'].between(-180, 180)]
+    if max_sites is not None:
+        df = df.head(max_sites)
     return df
 
 
-def main_wf(path): 
-    wildfire_df = load_data(path)
-    geo_wildfire = preprocess(wildfire_df)
-    cluster_df, wildfire_model, score = run_model(geo_wildfire)
-    geo_wildfire_df = convert_geodata(cluster_df)
-    geo_wildfire_df["latitude"] = geo_wildfire_df.geometry.y
-    geo_wildfire_df["longitude"] = geo_wildfire_df.geometry.x
+@profile_stage()
+def main_wf(path, clusters=10, scale_features=True, silhouette="auto", chunksize=None, eps_km=None,
+            plot_path="wildfire_summary_plot.png", as_geodataframe=True, registry_dir=None, plot_cache_dir=PLOT_CACHE_DIR): 
+    if chunksize: # out-of-core mode for archives that do not fit in memory
+        cluster_df, wildfire_model, score = run_model_incremental(path, clusters=clusters, scale_features=scale_features,
+                                                                  chunksize=chunksize, silhouette=silhouette)
+    elif eps_km: # geodesic density clustering instead of a fixed number of KMeans clusters
+        geo_wildfire = preprocess(load_data(path))
+        cluster_df, wildfire_model, score = run_model_geodesic(geo_wildfire, eps_km=eps_km, silhouette=silhouette)
+    elif registry_dir: # predict with the saved model, refit only on drift (see run_model_registered)
+        geo_wildfire = preprocess(load_data(path))
+        cluster_df, wildfire_model, score = run_model_registered(geo_wildfire, clusters=clusters, scale_features=scale_features,
+                                                                 registry_dir=registry_dir, silhouette=silhouette)
+    else:
+        wildfire_df = load_data(path)
+        geo_wildfire = preprocess(wildfire_df)
+        cluster_df, wildfire_model, score = run_model(geo_wildfire, clusters=clusters, scale_features=scale_features,
+                                                      silhouette=silhouette)
+    # geometry objects are only built for callers that need a GeoDataFrame
+    geo_wildfire_df = convert_geodata(cluster_df) if as_geodataframe else cluster_df
 
     # new - obtain cluster summary stats
     cluster_stats = get_cluster_summary(cluster_df)
 
-    plot_wildfire_summary(cluster_df)
+    plot_wildfire_summary(cluster_df, output_path=plot_path, cache_dir=plot_cache_dir)
 
     # Convert the dataframe to JSON and return
     return geo_wildfire_df, wildfire_model, score, cluster_stats
 
 
-if __name__ == "__main__": #Run the whole pipeline
-    file = '' #input wildfire data source here
-    wildfire_geo_df, wildfire_model = main_wf(file)
-    wildfire_geo_df.to_file('processed_wildfire_usable.json', driver='GeoJSON')
\ No newline at end of file
+if __name__ == "__main__": #Run the whole pipeline once (use refresh_service.py to keep it running on an interval)
+    file = 'MODIS_C6_1_USA_contiguous_and_Hawaii_24h.csv' #input wildfire data source here
+    wildfire_df, wildfire_model, score, cluster_stats = main_wf(file, as_geodataframe=False)
+    export_geojson(wildfire_df, 'processed_wildfire_usable.json')
\ No newline at end of file
@@ -1,6 +1,10 @@
 import unittest
 import pandas as pd
-from backend_processing import preprocess, run_model, get_cluster_summary, assign_risk_label
+import numpy as np
+from backend_processing import preprocess, run_model, get_cluster_summary, assign_risk_label, classify_risk, classify_risk_frame, score_clustering, \
+    run_model_incremental, fit_incremental, run_model_geodesic, select_cluster_count, \
+    cluster_color_column, generate_cluster_colors, NOISE_COLOR, cluster_risk_labels
+from sklearn.metrics import silhouette_score
 
 class TestBackendProcessing(unittest.TestCase):
     def setUp(self):
@@ -33,6 +37,149 @@ class TestBackendProcessing(unittest.TestCase):
         self.assertEqual(assign_risk_label(250), "Medium Risk")
         self.assertEqual(assign_risk_label(100), "Low Risk")
 
+    def test_classify_risk_matches_assign_risk_label(self):
+        values = [np.nan, 0, 199.99, 200, 250, 399.99, 400, 450]
+        labels = classify_risk(values)
+        self.assertEqual(list(labels), [assign_risk_label(v) for v in values])
+
+    def test_classify_risk_frame_multi_feature(self):
+        rules = {'brightness': (200, 400), 'frp': (12, 14)}
+        labels = classify_risk_frame(self.data, rules=rules)
+        self.assertEqual(list(labels), ["Medium Risk", "High Risk", "Medium Risk"])
+
+    def test_classify_risk_bad_labels(self):
+        with self.assertRaises(ValueError):
+            classify_risk([1, 2], thresholds=(1,), labels=["only one"])
+
+    def test_score_clustering_chunked_matches_full(self):
+        rng = np.random.default_rng(0)
+        points = np.vstack([rng.normal(0, 1, (60, 2)), rng.normal(5, 1, (40, 2)), [[20, 20]]])
+        labels = np.array([0] * 60 + [1] * 40 + [2])
+        result = score_clustering(points, labels, mode="chunked", working_memory_mb=0.001)
+        self.assertAlmostEqual(result["score"], silhouette_score(points, labels))
+        self.assertEqual(result["n"], 101)
+
+    def test_score_clustering_sample_interval(self):
+        rng = np.random.default_rng(1)
+        points = np.vstack([rng.normal(0, 1, (900, 2)), rng.normal(4, 1, (600, 2))])
+        labels = np.array([0] * 900 + [1] * 600)
+        result = score_clustering(points, labels, mode="sample", sample_size=300)
+        self.assertEqual(result["mode"], "sample")
+        self.assertLessEqual(result["n"], 301)
+        self.assertLess(result["ci_low"], result["ci_high"])
+        self.assertAlmostEqual(result["score"], silhouette_score(points, labels), delta=0.05)
+
+    def test_run_model_skips_silhouette(self):
+        df = preprocess(self.data.copy())
+        clustered_df, model, score = run_model(df, clusters=2, silhouette=None)
+        self.assertIsNone(score)
+        self.assertIsNone(clustered_df.attrs['silhouette'])
+
+    def test_run_model_incremental_contract(self):
+        rng = np.random.default_rng(2)
+        frame = pd.DataFrame({
+            'latitude': np.concatenate([rng.normal(34, 0.2, 50), rng.normal(45, 0.2, 50)]),
+            'longitude': np.concatenate([rng.normal(-119, 0.2, 50), rng.normal(-100, 0.2, 50)]),
+            'brightness': rng.uniform(150, 450, 100),
+            'frp': rng.uniform(1, 50, 100),
+        })
+        chunks = [frame.iloc[i:i + 7] for i in range(0, len(frame), 7)]
+        clustered_df, model, score = run_model_incremental(chunks, clusters=2)
+        self.assertEqual(len(clustered_df), 100)
+        self.assertEqual(len(clustered_df['cluster_mapping'].unique()), 2)
+        self.assertIn('risk_label', clustered_df.columns)
+        self.assertIn('color', clustered_df.columns)
+        self.assertGreater(score, 0.8)
+        # the scaler moments cover every chunk
+        self.assertEqual(model.scaler_.n_samples_seen_, 100)
+        np.testing.assert_allclose(model.scaler_.mean_, frame[['latitude', 'longitude']].mean().values)
+
+    def test_fit_incremental_continues_existing_model(self):
+        df = preprocess(self.data.copy())
+        model, scaler = fit_incremental([df], clusters=2)
+        centers = model.cluster_centers_.copy()
+        model, same_scaler = fit_incremental([df.iloc[:1]], model=model, scaler=scaler)
+        self.assertIs(same_scaler, scaler)
+        self.assertEqual(scaler.n_samples_seen_, 3)
+        self.assertEqual(model.cluster_centers_.shape, centers.shape)
+
+    def test_run_model_geodesic_uses_kilometres(self):
+        # two groups ~1 km apart internally, ~550 km from each other, plus an isolated point
+        df = pd.DataFrame({
+            'latitude': [64.0, 64.005, 64.01, 59.0, 59.005, 59.01, 40.0],
+            'longitude': [-150.0, -150.01, -150.0, -150.0, -150.01, -150.0, -100.0],
+            'brightness': [300, 410, 150, 300, 300, 300, 300],
+            'frp': [10, 10, 10, 10, 10, 10, 10],
+        })
+        clustered_df, model, score = run_model_geodesic(df, eps_km=5, min_samples=2)
+        labels = clustered_df['cluster_mapping'].tolist()
+        self.assertEqual(len(set(labels[:3])), 1)
+        self.assertEqual(len(set(labels[3:6])), 1)
+        self.assertNotEqual(labels[0], labels[3])
+        self.assertEqual(labels[6], -1)
+        self.assertIn('color', clustered_df.columns)
+        self.assertIn('risk_label', clustered_df.columns)
+        self.assertGreater(score, 0.9)
+        # noise is not a cluster: no summary row, and its risk comes from its own brightness
+        self.assertEqual(get_cluster_summary(clustered_df)['cluster_mapping'].tolist(), sorted(set(labels[:6])))
+        self.assertEqual(len(get_cluster_summary(clustered_df, include_noise=True)), 3)
+        clustered_df.loc[6, 'brightness'] = 450
+        risk = cluster_risk_labels(clustered_df)
+        self.assertEqual(risk[6], "High Risk")
+        self.assertEqual(risk[0], "Medium Risk") # cluster mean of 300, 410, 150
+
+    def test_select_cluster_count_finds_blobs(self):
+        rng = np.random.default_rng(3)
+        centers = np.array([[0, 0], [10, 0], [0, 10], [10, 10]])
+        points = np.vstack([rng.normal(center, 0.5, (40, 2)) for center in centers])
+        model, curve = select_cluster_count(points, k_range=range(2, 8), n_jobs=1)
+        self.assertEqual(model.n_clusters, 4)
+        self.assertEqual(curve['k'].tolist(), [2, 3, 4, 5, 6, 7])
+        self.assertEqual(int(curve.loc[curve['elbow'], 'k'].iloc[0]), 4)
+        self.assertTrue((curve['inertia'].diff().dropna() <= 0).all())
+
+    def test_select_cluster_count_parallel_matches_serial(self):
+        rng = np.random.default_rng(4)
+        points = np.vstack([rng.normal(center, 0.5, (30, 2)) for center in ([0, 0], [8, 0], [0, 8])])
+        _, serial = select_cluster_count(points, k_range=range(2, 6), n_jobs=1)
+        model, parallel = select_cluster_count(points, k_range=range(2, 6), n_jobs=2)
+        self.assertEqual(model.n_clusters, 3)
+        self.assertEqual(parallel['k'].tolist(), serial['k'].tolist())
+
+    def test_run_model_auto_clusters(self):
+        df = preprocess(self.data.copy())
+        clustered_df, model, score = run_model(df, clusters="auto", n_jobs=1)
+        self.assertEqual(model.n_clusters, 2)
+        self.assertEqual([row['k'] for row in clustered_df.attrs['k_scores']], [2])
+
+    def test_cluster_color_column_compact_and_shared(self):
+        clusters = pd.Series([3, 0, 3, 1], dtype='int8')
+        colors = cluster_color_column(clusters)
+        self.assertEqual(colors.codes.dtype, np.int8)
+        palette = generate_cluster_colors([0, 1, 3])
+        self.assertEqual([list(color) for color in colors], [palette['3'], palette['0'], palette['3'], palette['1']])
+
+    def test_cluster_colors_do_not_depend_on_other_ids(self):
+        all_ids = [list(color) for color in cluster_color_column([0, 1, 2, 3, 4])]
+        missing_two = [list(color) for color in cluster_color_column([0, 1, 3, 4])]
+        self.assertEqual(missing_two, all_ids[:2] + all_ids[3:])
+        self.assertEqual(list(cluster_color_column([3, 12])[0]), all_ids[3])
+        noise = list(cluster_color_column([-1, 19])[0])
+        self.assertEqual(noise[:3], list(NOISE_COLOR))
+        self.assertNotIn(noise, [list(color) for color in cluster_color_column(np.arange(20))])
+
+    def test_cluster_color_column_many_clusters(self):
+        colors = cluster_color_column(np.arange(40))
+        self.assertEqual(len(colors), 40)
+        self.assertTrue(all(len(color) == 4 for color in colors))
+
+    def test_run_model_compact_columns(self):
+        df = preprocess(self.data.copy())
+        clustered_df, model, score = run_model(df, clusters=2)
+        self.assertEqual(clustered_df['cluster_mapping'].dtype, np.int8)
+        self.assertIsInstance(clustered_df['risk_label'].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(clustered_df['color'].dtype, pd.CategoricalDtype)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
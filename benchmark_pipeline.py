@@ -0,0 +1,214 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+import tracemalloc
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import numpy as np
+import pandas as pd
+
+import backend_processing
+from geo_export import export_geojson
+from synthetic_modis import write_modis_csv
+from url_ingest import read_csv_url
+
+"""
+benchmark_pipeline.py
+
+Description:
+    Times every stage of the wildfire pipeline (load, preprocess, KMeans fit,
+    silhouette scoring, cluster summary, summary plot, GeoJSON export) on
+    synthetic MODIS files of increasing size, once reading the CSV from disk
+    and once streaming it from a local HTTP server. Wall time and peak
+    traced memory are recorded per stage and size; results can be saved as
+    a baseline and later runs are compared against it to catch regressions.
+
+    python3 benchmark_pipeline.py --sizes 1000 10000 100000 --save
+    python3 benchmark_pipeline.py --check   (exit code 1 on a regression)
+"""
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+BASELINE_FILE = "benchmark_baseline.json"
+MODES = ("file", "url")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_directory(directory):
+    """
+    Serves directory over HTTP on a free local port from a daemon thread.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def synthetic_file(data_dir, n_rows, seed=0):
+    # generated files are reused between runs, they only depend on (n_rows, seed)
+    path = os.path.join(data_dir, f"synthetic_modis_{n_rows}_{seed}.csv")
+    if not os.path.exists(path):
+        write_modis_csv(path, n_rows, seed=seed)
+    return path
+
+def measure(stage, function, *args, **kwargs):
+    """
+    Calls function(*args, **kwargs) and returns (result, record) where record holds
+    the wall time, CPU time and peak traced memory (MiB) of the call.
+    """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started, cpu_started = time.perf_counter(), time.process_time()
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        seconds, cpu_seconds = time.perf_counter() - started, time.process_time() - cpu_started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, {"stage": stage, "seconds": round(seconds, 4), "cpu_seconds": round(cpu_seconds, 4),
+                    "peak_mb": round(peak / 2**20, 2)}
+
+def benchmark_pipeline(source, mode="file", clusters=10, output_dir=None):
+    """
+    Runs the main_wf stages one by one on source (a CSV path, or a URL when mode="url").
+    Returns the list of per-stage records.
+    """
+    output_dir = output_dir or tempfile.mkdtemp(prefix="wildfire-bench-")
+    records = []
+    if mode == "url":
+        wildfire_df, record = measure("ingest_url", read_csv_url, source)
+    else:
+        wildfire_df, record = measure("load_data", backend_processing.load_data, source)
+    records.append(record)
+
+    wildfire_df, record = measure("preprocess", backend_processing.preprocess, wildfire_df)
+    records.append(record)
+    (cluster_df, _, _), record = measure("run_model", backend_processing.run_model, wildfire_df,
+                                         clusters=clusters, silhouette=None)
+    records.append(record)
+    # scored separately (run_model was told to skip it) on the same standardised coordinates
+    coordinates = cluster_df[['latitude', 'longitude']].to_numpy()
+    coordinates = (coordinates - coordinates.mean(axis=0)) / coordinates.std(axis=0)
+    _, record = measure("score_clustering", backend_processing.score_clustering, coordinates,
+                        cluster_df['cluster_mapping'].to_numpy())
+    records.append(record)
+    _, record = measure("cluster_summary", backend_processing.get_cluster_summary, cluster_df)
+    records.append(record)
+    _, record = measure("plot_summary", backend_processing.plot_wildfire_summary, cluster_df,
+                        output_path=os.path.join(output_dir, "wildfire_summary_plot.png"), cache_dir=None)
+    records.append(record)
+    _, record = measure("export_geojson", export_geojson, cluster_df,
+                        os.path.join(output_dir, "processed_wildfire_usable.json"))
+    records.append(record)
+
+    total = {"stage": "total", "seconds": round(sum(r["seconds"] for r in records), 4),
+             "cpu_seconds": round(sum(r["cpu_seconds"] for r in records), 4),
+             "peak_mb": max(r["peak_mb"] for r in records)}
+    return records + [total]
+
+def run_benchmarks(sizes=DEFAULT_SIZES, modes=MODES, seed=0, clusters=10, data_dir=None):
+    """
+    Benchmarks every size in every ingestion mode. Returns a DataFrame with one row
+    per (rows, mode, stage).
+    """
+    data_dir = data_dir or tempfile.mkdtemp(prefix="wildfire-bench-data-")
+    os.makedirs(data_dir, exist_ok=True)
+    server, base_url = serve_directory(data_dir) if "url" in modes else (None, None)
+    results = []
+    try:
+        for n_rows in sizes:
+            path = synthetic_file(data_dir, n_rows, seed)
+            for mode in modes:
+                source = f"{base_url}/{os.path.basename(path)}" if mode == "url" else path
+                with tempfile.TemporaryDirectory() as output_dir:
+                    for record in benchmark_pipeline(source, mode=mode, clusters=clusters, output_dir=output_dir):
+                        results.append({"rows": n_rows, "mode": mode, **record})
+                print(f"Benchmarked {n_rows} rows ({mode}): {results[-1]['seconds']:.2f}s, "
+                      f"peak {results[-1]['peak_mb']:.1f} MiB")
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    return pd.DataFrame(results)
+
+def environment_info():
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "pandas": pd.__version__}
+
+def save_baseline(results, path=BASELINE_FILE, seed=0):
+    baseline = {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "seed": seed,
+                "environment": environment_info(), "results": results.to_dict("records")}
+    with open(path, "w") as handle:
+        json.dump(baseline, handle, indent=2)
+    print(f"Baseline saved to {path}")
+
+def load_baseline(path=BASELINE_FILE):
+    with open(path) as handle:
+        baseline = json.load(handle)
+    if baseline.get("environment") != environment_info():
+        print("Warning: baseline was recorded on a different environment, comparisons may be noisy.")
+    return pd.DataFrame(baseline["results"])
+
+def compare_to_baseline(results, baseline, tolerance=0.25, min_seconds=0.05, min_mb=1.0):
+    """
+    Flags stages that got slower or use more memory than the baseline.
+    A stage regresses when it is more than tolerance (relative) AND more than
+    min_seconds / min_mb (absolute) above its baseline value, so tiny stages do not
+    trip on timer noise. Returns a DataFrame of the regressions (empty when none).
+    """
+    keys = ["rows", "mode", "stage"]
+    merged = results.merge(baseline, on=keys, suffixes=("", "_baseline"))
+    flagged = []
+    for metric, floor in (("seconds", min_seconds), ("peak_mb", min_mb)):
+        current, previous = merged[metric], merged[f"{metric}_baseline"]
+        regressed = (current > previous * (1 + tolerance)) & (current - previous > floor)
+        for _, row in merged[regressed].iterrows():
+            flagged.append({**{key: row[key] for key in keys}, "metric": metric, "baseline": row[f"{metric}_baseline"],
+                            "current": row[metric], "change": round(row[metric] / row[f"{metric}_baseline"] - 1, 3)
+                            if row[f"{metric}_baseline"] else float("inf")})
+    return pd.DataFrame(flagged, columns=keys + ["metric", "baseline", "current", "change"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the wildfire pipeline on synthetic MODIS data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="row counts to benchmark (up to 10M)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clusters", type=int, default=10)
+    parser.add_argument("--data-dir", default=None, help="where the synthetic CSVs are generated and reused")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="compare against the baseline, exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--output", default=None, help="also write the raw results to this CSV")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, modes=args.modes, seed=args.seed, clusters=args.clusters, data_dir=args.data_dir)
+    print(results.pivot_table(index=["rows", "mode"], columns="stage", values="seconds").round(3).to_string())
+    if args.output:
+        results.to_csv(args.output, index=False)
+    exit_code = 0
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}, run with --save first.")
+            exit_code = 1
+        else:
+            regressions = compare_to_baseline(results, load_baseline(args.baseline), tolerance=args.tolerance)
+            if regressions.empty:
+                print("No regressions against the baseline.")
+            else:
+                print("Regressions against the baseline:")
+                print(regressions.to_string(index=False))
+                exit_code = 1
+    if args.save:
+        save_baseline(results, args.baseline, seed=args.seed)
+    sys.exit(exit_code)
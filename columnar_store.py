@@ -0,0 +1,116 @@
+import os
+
+import pandas as pd
+
+"""
+columnar_store.py
+
+Description:
+    Converts MODIS CSV exports once into an uncompressed Arrow IPC (Feather v2)
+    file with an explicit, compact schema, and loads it back through memory
+    mapping with column projection. Reopening a converted archive skips the
+    CSV parse and dtype inference entirely.
+
+    Requires pyarrow (pip install pyarrow).
+"""
+
+COLUMNAR_EXTENSIONS = (".arrow", ".feather")
+
+# Column -> dtype kept in the store. Columns missing from a CSV are skipped, extra
+# columns are kept with whatever dtype pandas infers for them.
+MODIS_SCHEMA = {
+    "latitude": "float32",
+    "longitude": "float32",
+    "brightness": "float32",
+    "scan": "float32",
+    "track": "float32",
+    "acq_date": "category",
+    "acq_time": "int16",
+    "satellite": "category",
+    "confidence": "uint8",
+    "version": "category",
+    "bright_t31": "float32",
+    "frp": "float32",
+    "daynight": "category",
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+    except ImportError as e:
+        raise ImportError("The columnar store needs pyarrow, install it with 'pip install pyarrow'") from e
+    return pyarrow
+
+def is_columnar_path(path):
+    return isinstance(path, str) and path.lower().endswith(COLUMNAR_EXTENSIONS)
+
+def acquisition_timestamp(acq_date, acq_time):
+    """
+    Combines the MODIS acq_date (YYYY-MM-DD) and acq_time (HHMM, UTC) columns into one
+    UTC timestamp column, vectorized.
+    """
+    hhmm = pd.to_numeric(pd.Series(acq_time), errors="coerce").to_numpy()
+    offsets = pd.to_timedelta(hhmm // 100 * 60 + hhmm % 100, unit="min").to_numpy()
+    return pd.to_datetime(pd.Series(acq_date).astype(str), format="%Y-%m-%d", utc=True) + offsets
+
+def apply_schema(dataframe):
+    """
+    Casts a raw MODIS frame to MODIS_SCHEMA and adds the acq_datetime column.
+    Non-numeric confidence values (e.g. VIIRS 'l'/'n'/'h') are stored as a category instead.
+    """
+    dataframe = dataframe.copy()
+    for column, dtype in MODIS_SCHEMA.items():
+        if column not in dataframe.columns:
+            continue
+        if dtype == "category":
+            dataframe[column] = dataframe[column].astype(str).astype("category")
+        elif column == "confidence" and not pd.api.types.is_numeric_dtype(dataframe[column]):
+            dataframe[column] = dataframe[column].astype("category")
+        elif dataframe[column].isna().any() and not dtype.startswith("float"):
+            dataframe[column] = dataframe[column].astype("float32")
+        else:
+            dataframe[column] = dataframe[column].astype(dtype)
+    if "acq_date" in dataframe.columns and "acq_time" in dataframe.columns:
+        dataframe["acq_datetime"] = acquisition_timestamp(dataframe["acq_date"], dataframe["acq_time"])
+    return dataframe
+
+def convert_csv_to_columnar(csv_path, store_path=None, batch_rows=1_000_000):
+    """
+    One-time conversion of a MODIS CSV into the columnar store.
+    The file is written uncompressed so it can be memory mapped on load.
+    Returns the path of the store.
+    """
+    pa = _require_pyarrow()
+    if store_path is None:
+        store_path = os.path.splitext(csv_path)[0] + ".arrow"
+    dataframe = apply_schema(pd.read_csv(csv_path))
+    table = pa.Table.from_pandas(dataframe, preserve_index=False)
+    temp_path = store_path + ".tmp"
+    pa.feather.write_feather(table, temp_path, compression="uncompressed", chunksize=batch_rows)
+    os.replace(temp_path, store_path)
+    print(f"Converted {csv_path} ({len(dataframe)} rows) to {store_path}")
+    return store_path
+
+def ensure_columnar(csv_path, store_path=None):
+    """
+    Returns the columnar store for csv_path, converting it first if the store is
+    missing or older than the CSV.
+    """
+    if store_path is None:
+        store_path = os.path.splitext(csv_path)[0] + ".arrow"
+    if not os.path.exists(store_path) or os.path.getmtime(store_path) < os.path.getmtime(csv_path):
+        convert_csv_to_columnar(csv_path, store_path)
+    return store_path
+
+def load_columnar(store_path, columns=None, chunksize=None):
+    """
+    Memory maps the store and materialises only the requested columns.
+    With a chunksize an iterator of dataframes of at most chunksize rows is returned.
+    """
+    pa = _require_pyarrow()
+    table = pa.feather.read_table(store_path, columns=columns, memory_map=True)
+    if chunksize:
+        return (batch.to_pandas() for batch in table.to_batches(max_chunksize=chunksize))
+    return table.to_pandas(split_blocks=True)
@@ -0,0 +1,192 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from backend_processing import get_cluster_summary
+from columnar_store import apply_schema
+from feed_sync import DETECTION_KEY, detection_hashes
+from pipeline_profiler import profile_stage
+
+"""
+detection_archive.py
+
+Description:
+    Persistent multi-day archive of detections, partitioned by acquisition
+    date (one Parquet file per acq_date, hive style directories). Appending
+    a snapshot only rewrites the partitions of the days it contains, and a
+    small per-cluster summary in the get_cluster_summary shape is stored
+    next to every day so trends over weeks are read from the summaries
+    instead of the raw detections. Range queries open only the partitions
+    of the requested days; inside a partition rows are sorted by latitude
+    in row groups, so a bounding box skips most of the file.
+
+    Requires pyarrow (pip install pyarrow).
+"""
+
+ARCHIVE_DIR = "wildfire_archive"
+DETECTIONS_DIR = "detections"
+SUMMARIES_DIR = "daily_clusters"
+ROW_GROUP_ROWS = 50000
+DROPPED_COLUMNS = ("geometry", "color") # derived at load time, not worth storing
+
+
+def _partition_path(archive_dir, kind, day):
+    return os.path.join(archive_dir, kind, f"acq_date={day}", f"{kind}.parquet")
+
+def list_archive_days(archive_dir=ARCHIVE_DIR, kind=DETECTIONS_DIR):
+    # archived acquisition dates (YYYY-MM-DD), oldest first
+    root = os.path.join(archive_dir, kind)
+    if not os.path.isdir(root):
+        return []
+    return sorted(name.split("=", 1)[1] for name in os.listdir(root)
+                  if name.startswith("acq_date=") and os.path.exists(_partition_path(archive_dir, kind, name.split("=", 1)[1])))
+
+def _write_parquet(dataframe, path):
+    # written next to the target and renamed, so readers never see a half-written partition
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(handle)
+    try:
+        dataframe.to_parquet(temp_path, index=False, row_group_size=ROW_GROUP_ROWS)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def daily_cluster_summary(day_frame):
+    """
+    get_cluster_summary of one day of detections, plus the number of detections,
+    the max brightness and the centroid of each cluster. Rows without clusters are
+    summarised as cluster -1.
+    """
+    day_frame = day_frame.copy()
+    if 'cluster_mapping' not in day_frame.columns:
+        day_frame['cluster_mapping'] = -1
+    summary = get_cluster_summary(day_frame, include_noise=True)
+    extra = day_frame.groupby('cluster_mapping').agg(
+        detections=('brightness', 'size'),
+        max_brightness=('brightness', 'max'),
+        centroid_latitude=('latitude', 'mean'),
+        centroid_longitude=('longitude', 'mean'),
+    ).reset_index()
+    summary = summary.merge(extra, on='cluster_mapping')
+    return summary.round({'max_brightness': 2, 'centroid_latitude': 4, 'centroid_longitude': 4})
+
+@profile_stage()
+def append_detections(dataframe, archive_dir=ARCHIVE_DIR):
+    """
+    Adds a snapshot (raw or clustered detections with acq_date/acq_time) to the archive.
+    Only the partitions of the days present in dataframe are rewritten; detections that
+    are already archived (same DETECTION_KEY) are replaced by the new rows, so
+    overlapping 24h pulls do not create duplicates. Returns the list of days written.
+    """
+    if 'acq_date' not in dataframe.columns:
+        raise ValueError("Detections need an acq_date column to be archived")
+    frame = apply_schema(dataframe.drop(columns=[c for c in DROPPED_COLUMNS if c in dataframe.columns]))
+    frame['acq_date'] = frame['acq_date'].astype(str)
+    written = []
+    for day, day_rows in frame.groupby('acq_date', sort=True):
+        path = _partition_path(archive_dir, DETECTIONS_DIR, day)
+        day_rows = day_rows.drop(columns='acq_date')
+        if os.path.exists(path):
+            day_rows = pd.concat([pd.read_parquet(path), day_rows], ignore_index=True)
+            if set(DETECTION_KEY) <= set(day_rows.columns) | {'acq_date'}:
+                hashes = detection_hashes(day_rows.assign(acq_date=day))
+                day_rows = day_rows[~pd.Series(hashes).duplicated(keep='last').to_numpy()]
+        day_rows = day_rows.sort_values(['latitude', 'longitude'], kind='stable').reset_index(drop=True)
+        _write_parquet(day_rows, path)
+        summary = daily_cluster_summary(day_rows)
+        summary.insert(0, 'acq_date', day)
+        _write_parquet(summary, _partition_path(archive_dir, SUMMARIES_DIR, day))
+        written.append(day)
+    print(f"Archived {len(frame)} detections into {len(written)} daily partitions of {archive_dir}")
+    return written
+
+def _utc(value):
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    return value.tz_localize("UTC") if value.tzinfo is None else value.tz_convert("UTC")
+
+def _days_in_range(days, start, end):
+    # start inclusive, end exclusive; a partition is needed if any of its 24 hours overlaps
+    start, end = _utc(start), _utc(end)
+    selected = []
+    for day in days:
+        day_start = pd.Timestamp(day, tz="UTC")
+        if start is not None and day_start + pd.Timedelta(days=1) <= start:
+            continue
+        if end is not None and day_start >= end:
+            continue
+        selected.append(day)
+    return selected, start, end
+
+@profile_stage()
+def query_detections(start=None, end=None, bbox=None, columns=None, archive_dir=ARCHIVE_DIR):
+    """
+    Archived detections acquired in [start, end) (UTC, anything pd.Timestamp accepts;
+    naive values are taken as UTC) inside bbox = (min_lon, min_lat, max_lon, max_lat).
+    Only the partitions of the days in the range are opened, and row groups outside
+    the box are skipped from their statistics.
+    """
+    import pyarrow.parquet as pq
+    days, start, end = _days_in_range(list_archive_days(archive_dir), start, end)
+    filters = []
+    if bbox is not None:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        filters += [('latitude', '>=', min_lat), ('latitude', '<=', max_lat),
+                    ('longitude', '>=', min_lon), ('longitude', '<=', max_lon)]
+    frames = []
+    for day in days:
+        path = _partition_path(archive_dir, DETECTIONS_DIR, day)
+        available = pq.read_schema(path).names
+        day_filters = list(filters)
+        if 'acq_datetime' in available:
+            if start is not None:
+                day_filters.append(('acq_datetime', '>=', start.to_pydatetime()))
+            if end is not None:
+                day_filters.append(('acq_datetime', '<', end.to_pydatetime()))
+        read_columns = None if columns is None else [c for c in columns if c in available and c != 'acq_date']
+        table = pq.read_table(path, columns=read_columns, filters=day_filters or None)
+        frame = table.to_pandas()
+        frame.insert(0, 'acq_date', day)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=['acq_date'] + [c for c in (columns or []) if c != 'acq_date'])
+    result = pd.concat(frames, ignore_index=True)
+    result['acq_date'] = result['acq_date'].astype('category')
+    return result
+
+def load_daily_summaries(start=None, end=None, archive_dir=ARCHIVE_DIR):
+    """
+    Precomputed per-day, per-cluster summaries for the days in [start, end).
+    """
+    days, _, _ = _days_in_range(list_archive_days(archive_dir, SUMMARIES_DIR), start, end)
+    if not days:
+        return pd.DataFrame(columns=['acq_date', 'cluster_mapping', 'avg_brightness', 'avg_frp', 'avg_risk',
+                                     'detections', 'max_brightness', 'centroid_latitude', 'centroid_longitude'])
+    return pd.concat([pd.read_parquet(_partition_path(archive_dir, SUMMARIES_DIR, day)) for day in days],
+                     ignore_index=True)
+
+def rolling_trends(summaries, window_days=7):
+    """
+    Daily totals from the cluster summaries: detections, and the detection weighted
+    avg_brightness / avg_frp / avg_risk, with a window_days rolling mean of each
+    (columns suffixed _rolling). Days missing from the archive count as 0 detections.
+    """
+    metrics = ['avg_brightness', 'avg_frp', 'avg_risk']
+    columns = ['detections'] + metrics
+    if summaries.empty:
+        return pd.DataFrame(columns=columns + [f"{c}_rolling" for c in columns])
+    weighted = summaries[metrics].mul(summaries['detections'], axis=0)
+    weighted['detections'] = summaries['detections']
+    weighted['acq_date'] = pd.to_datetime(summaries['acq_date'])
+    daily = weighted.groupby('acq_date').sum()
+    daily[metrics] = daily[metrics].div(daily['detections'].replace(0, np.nan), axis=0)
+    daily = daily.reindex(pd.date_range(daily.index.min(), daily.index.max(), freq='D', name='acq_date'))
+    daily['detections'] = daily['detections'].fillna(0).astype(int)
+    for column in columns:
+        daily[f"{column}_rolling"] = daily[column].rolling(window_days, min_periods=1).mean().round(2)
+    return daily[columns + [f"{c}_rolling" for c in columns]].round(2)
@@ -0,0 +1,172 @@
+import os
+import json
+import tempfile
+from email.utils import formatdate
+from urllib.parse import urlparse, unquote
+from urllib.request import url2pathname
+
+import numpy as np
+import pandas as pd
+
+from url_ingest import open_url_stream
+
+"""
+feed_sync.py
+
+Description:
+    Polls an overlapping near-real-time feed (e.g. the FIRMS 24h CSV) cheaply.
+    Requests are conditional (If-None-Match / If-Modified-Since) so an
+    unchanged feed costs one 304 round trip, and changed feeds are
+    deduplicated against a persisted set of detection keys so only rows that
+    were never seen before are passed downstream.
+"""
+
+DETECTION_KEY = ['latitude', 'longitude', 'acq_date', 'acq_time', 'satellite']
+STATE_FILE = "feed_state.json"
+SEEN_FILE = "seen_detections.npz"
+
+
+def _atomic_write(path, write):
+    directory = os.path.dirname(path) or "."
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(handle)
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def load_feed_state(state_dir):
+    """
+    Returns (validators, seen_hashes, seen_days): the per-URL ETag/Last-Modified values and
+    the sorted uint64 keys of every detection already processed with its acquisition day.
+    """
+    validators = {}
+    state_path = os.path.join(state_dir, STATE_FILE)
+    if os.path.exists(state_path):
+        with open(state_path) as handle:
+            validators = json.load(handle)
+    seen_path = os.path.join(state_dir, SEEN_FILE)
+    if os.path.exists(seen_path):
+        with np.load(seen_path) as seen:
+            return validators, seen["hashes"], seen["days"]
+    return validators, np.array([], dtype=np.uint64), np.array([], dtype=np.int32)
+
+def detection_hashes(dataframe):
+    """
+    Hashes the DETECTION_KEY columns of each row into a uint64, after normalising the
+    types so the same detection hashes identically whichever pull (or dtype) it came from.
+    """
+    key = pd.DataFrame({
+        'latitude': pd.to_numeric(dataframe['latitude']).astype('float64').round(5).to_numpy(),
+        'longitude': pd.to_numeric(dataframe['longitude']).astype('float64').round(5).to_numpy(),
+        'acq_date': dataframe['acq_date'].astype(str).to_numpy(),
+        'acq_time': pd.to_numeric(dataframe['acq_time']).astype('int64').to_numpy(),
+        'satellite': dataframe['satellite'].astype(str).to_numpy(),
+    })
+    return pd.util.hash_pandas_object(key, index=False).to_numpy()
+
+def _local_validator(url):
+    parsed = urlparse(url)
+    path = url2pathname(unquote(parsed.path)) if parsed.scheme == "file" else url
+    stat = os.stat(path)
+    return {"Last-Modified": formatdate(stat.st_mtime, usegmt=True), "size": stat.st_size}
+
+def poll_feed(url, state_dir=".wildfire_feed", chunksize=100000, **stream_kwargs):
+    """
+    Fetches url only if it changed since the last committed poll and returns
+    (new_rows, pending). new_rows is None when the feed is unchanged (HTTP 304, or the
+    same mtime/size for local files) and an empty dataframe when every row was a duplicate.
+    Nothing is persisted until commit_poll(state_dir, pending) is called, so a failure
+    downstream makes the next poll retry the same rows.
+    """
+    validators, seen_hashes, _ = load_feed_state(state_dir)
+    previous = validators.get(url, {})
+    scheme = urlparse(url).scheme
+
+    if scheme in ("", "file"):
+        current = _local_validator(url)
+        if previous and previous == current:
+            return None, None
+        stream, response = open_url_stream(url, **stream_kwargs)
+    else:
+        headers = {}
+        if previous.get("ETag"):
+            headers["If-None-Match"] = previous["ETag"]
+        if previous.get("Last-Modified"):
+            headers["If-Modified-Since"] = previous["Last-Modified"]
+        stream, response = open_url_stream(url, headers=headers, **stream_kwargs)
+        if response.status_code == 304:
+            stream.close()
+            response.close()
+            return None, None
+        current = {name: response.headers[name] for name in ("ETag", "Last-Modified") if name in response.headers}
+
+    new_chunks, new_hashes = [], []
+    try:
+        with pd.read_csv(stream, chunksize=chunksize) as reader:
+            for chunk in reader:
+                hashes = detection_hashes(chunk)
+                # drop rows seen in earlier polls, then duplicates inside this pull
+                fresh = ~_sorted_contains(seen_hashes, hashes)
+                _, first = np.unique(hashes, return_index=True)
+                unique_in_chunk = np.zeros(len(hashes), dtype=bool)
+                unique_in_chunk[first] = True
+                fresh &= unique_in_chunk
+                if new_hashes:
+                    fresh &= ~np.isin(hashes, np.concatenate(new_hashes))
+                new_chunks.append(chunk[fresh])
+                new_hashes.append(hashes[fresh])
+    finally:
+        stream.close()
+        if response is not None:
+            response.close()
+
+    new_rows = pd.concat(new_chunks, ignore_index=True) if new_chunks else pd.DataFrame(columns=DETECTION_KEY)
+    hashes = np.concatenate(new_hashes) if new_hashes else np.array([], dtype=np.uint64)
+    days = _day_numbers(new_rows['acq_date']) if len(new_rows) else np.array([], dtype=np.int32)
+    print(f"Feed poll: {len(new_rows)} new detections")
+    return new_rows, {"url": url, "validator": current, "hashes": hashes, "days": days}
+
+def commit_poll(state_dir, pending, retain_days=7):
+    """
+    Persists the validators and detection keys of a successful poll. Keys of detections
+    acquired more than retain_days before the newest one are pruned, which keeps the
+    store bounded for rolling feeds.
+    """
+    if pending is None:
+        return
+    os.makedirs(state_dir, exist_ok=True)
+    validators, seen_hashes, seen_days = load_feed_state(state_dir)
+    validators[pending["url"]] = pending["validator"]
+
+    hashes = np.concatenate([seen_hashes, pending["hashes"]])
+    days = np.concatenate([seen_days, pending["days"]])
+    if len(days):
+        keep = days >= days.max() - retain_days
+        hashes, days = hashes[keep], days[keep]
+    order = np.argsort(hashes)
+
+    def write_seen(path):
+        with open(path, "wb") as handle:
+            np.savez(handle, hashes=hashes[order], days=days[order])
+
+    def write_validators(path):
+        with open(path, "w") as handle:
+            json.dump(validators, handle)
+
+    _atomic_write(os.path.join(state_dir, SEEN_FILE), write_seen)
+    _atomic_write(os.path.join(state_dir, STATE_FILE), write_validators)
+
+def _sorted_contains(sorted_values, values):
+    if len(sorted_values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(sorted_values, values).clip(max=len(sorted_values) - 1)
+    return sorted_values[positions] == values
+
+def _day_numbers(acq_date):
+    dates = pd.to_datetime(acq_date.astype(str), format="%Y-%m-%d", errors="coerce")
+    # unparseable dates count as the newest day so they are not pruned straight away
+    dates = dates.fillna(dates.max() if dates.notna().any() else pd.Timestamp.now())
+    return dates.to_numpy().astype("datetime64[D]").astype(np.int64).astype(np.int32)
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from backend_processing import RISK_LABELS
+
+"""
+filter_index.py
+
+Description:
+    Precomputed index for the dashboard's risk level and brightness filters.
+    The processed frame is reordered once so rows are grouped by risk label
+    and sorted by brightness inside each group; the index keeps the offset
+    where each label starts and the sorted brightness values. Every label's
+    rows are then one contiguous range, a brightness range inside it is two
+    binary searches, and a filter change only slices the base frame instead
+    of building boolean masks and copies over all of it.
+"""
+
+MAX_PREPARED = 4
+
+_prepared = OrderedDict()
+
+
+def build_filter_index(dataframe, label_column='risk_label', labels=RISK_LABELS):
+    """
+    Returns (sorted_frame, index). sorted_frame holds the rows of dataframe grouped by
+    label (in labels order) and sorted by brightness, with a fresh 0..n-1 index.
+    index: {'labels', 'offsets' (label i spans offsets[i]:offsets[i + 1]), 'brightness'}.
+    Rows whose label is not in labels are dropped.
+    """
+    codes = pd.Index(labels).get_indexer(dataframe[label_column])
+    brightness = dataframe['brightness'].to_numpy(dtype=float)
+    order = np.lexsort((brightness, codes))
+    order = order[codes[order] >= 0]
+    sorted_frame = dataframe.take(order).reset_index(drop=True)
+    sorted_codes = codes[order]
+    index = {
+        'labels': list(labels),
+        'offsets': np.searchsorted(sorted_codes, np.arange(len(labels) + 1), side='left'),
+        'brightness': brightness[order],
+    }
+    return sorted_frame, index
+
+def label_rows(index, label):
+    # row ids (positions in the sorted frame) of one label, as a range
+    i = index['labels'].index(label)
+    return range(int(index['offsets'][i]), int(index['offsets'][i + 1]))
+
+def present_labels(index):
+    return [label for label in index['labels'] if len(label_rows(index, label))]
+
+def brightness_bounds(index, labels=None):
+    """
+    (min, max) brightness over the given labels (all by default), read from the
+    ends of each sorted label range. None when there are no rows.
+    """
+    ranges = [label_rows(index, label) for label in (labels if labels is not None else index['labels'])]
+    ranges = [rows for rows in ranges if len(rows)]
+    if not ranges:
+        return None
+    brightness = index['brightness']
+    return float(min(brightness[rows.start] for rows in ranges)), float(max(brightness[rows.stop - 1] for rows in ranges))
+
+def filter_slices(index, labels, low=-np.inf, high=np.inf):
+    """
+    (start, stop) position ranges of the rows with a label in labels and low <= brightness <= high.
+    """
+    brightness = index['brightness']
+    slices = []
+    for label in index['labels']: # index order, so the slices come out in frame order
+        if label not in labels:
+            continue
+        rows = label_rows(index, label)
+        start = rows.start + np.searchsorted(brightness[rows.start:rows.stop], low, side='left')
+        stop = rows.start + np.searchsorted(brightness[rows.start:rows.stop], high, side='right')
+        if stop > start:
+            slices.append((int(start), int(stop)))
+    return slices
+
+def filter_frame(sorted_frame, index, labels, low=-np.inf, high=np.inf):
+    """
+    Rows of sorted_frame passing the filters. A single contiguous range comes back as a
+    slice of the base frame; several ranges only copy the selected rows.
+    """
+    slices = filter_slices(index, labels, low, high)
+    if not slices:
+        return sorted_frame.iloc[0:0]
+    if len(slices) == 1:
+        return sorted_frame.iloc[slices[0][0]:slices[0][1]]
+    # neighbouring label ranges that are selected whole join into one slice
+    merged = [list(slices[0])]
+    for start, stop in slices[1:]:
+        if start == merged[-1][1]:
+            merged[-1][1] = stop
+        else:
+            merged.append([start, stop])
+    if len(merged) == 1:
+        return sorted_frame.iloc[merged[0][0]:merged[0][1]]
+    return sorted_frame.iloc[np.concatenate([np.arange(start, stop) for start, stop in merged])]
+
+def brightness_histogram(index, labels, low, high, nbins=30):
+    """
+    Pre-binned brightness histogram of the filtered rows, one row per (risk_label, bin)
+    with bin_start, bin_end, bin_center and count. Every count is the difference of two
+    binary searches in the sorted brightness of a label, so no row is visited.
+    """
+    brightness = index['brightness']
+    edges = np.linspace(low, high if high > low else low + 1e-9, nbins + 1)
+    frames = []
+    for label in index['labels']:
+        if label not in labels:
+            continue
+        rows = label_rows(index, label)
+        segment = brightness[rows.start:rows.stop]
+        positions = np.searchsorted(segment, edges, side='left')
+        positions[-1] = np.searchsorted(segment, edges[-1], side='right') # the last bin includes high
+        if positions[-1] > positions[0]:
+            frames.append(pd.DataFrame({'risk_label': label, 'bin_start': edges[:-1], 'bin_end': edges[1:],
+                                        'bin_center': (edges[:-1] + edges[1:]) / 2, 'count': np.diff(positions)}))
+    if not frames:
+        return pd.DataFrame(columns=['risk_label', 'bin_start', 'bin_end', 'bin_center', 'count'])
+    return pd.concat(frames, ignore_index=True)
+
+def lookup_prepared(key):
+    """
+    The memoised (sorted_frame, index) of key, or None. Lets a caller skip loading (or
+    copying) the raw data when its prepared frame is already here.
+    """
+    if key is None or key not in _prepared:
+        return None
+    _prepared.move_to_end(key)
+    return _prepared[key]
+
+def prepared_frame(key, dataframe, prepare=None):
+    """
+    build_filter_index(prepare(dataframe)), memoised on key so dashboard reruns on the
+    same dataset reuse the sorted frame and its index. key=None always rebuilds.
+    prepare: optional function adding the label/color columns before indexing.
+    """
+    result = lookup_prepared(key)
+    if result is not None:
+        return result
+    result = build_filter_index(prepare(dataframe) if prepare is not None else dataframe)
+    if key is not None:
+        _prepared[key] = result
+        while len(_prepared) > MAX_PREPARED:
+            _prepared.popitem(last=False)
+    return result
@@ -1,44 +1,40 @@
+import os
+import time
 import streamlit as st
 import pandas as pd
-import json
 import pydeck as pdk
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
 import plotly.express as px  # Added for histogram visualization
-from backend_processing import main_wf, run_model, auto_update_and_train, load_water_resources
-
-# Function to make new cluster colors to differentiate
-def generate_cluster_colors(cluster_ids):
-    num_clusters = len(cluster_ids)
-    color_map = plt.get_cmap('tab20', num_clusters)
-    cluster_colors = {
-        str(cluster): [int(c * 255) for c in color_map(i)[:3]] + [160]
-        for i, cluster in enumerate(cluster_ids)
-    }
-    return cluster_colors
-
-def label_cluster(cluster_id, cluster_brightness):
-    avg_brightness = cluster_brightness.get(cluster_id, 0)
-    if avg_brightness >= 400:
-        return "High Risk"
-    elif avg_brightness >= 200:
-        return "Medium Risk"
-    else:
-        return "Low Risk"
+from backend_processing import run_model, cluster_risk_labels, cluster_color_column
+from result_cache import cached_main_wf, cached_auto_update_and_train, invalidate_cache, file_fingerprint, url_fingerprint
+from columnar_store import ensure_columnar
+from refresh_service import load_published, load_published_grid, read_manifest, published_path
+from spatial_aggregation import aggregate_grid, choose_resolution, pyramid_level, add_cell_colors, cell_radius_m
+from water_index import load_water_index, add_nearest_water
+from detection_archive import ARCHIVE_DIR, list_archive_days, load_daily_summaries, rolling_trends
+from model_registry import REGISTRY_DIR, read_current
+from filter_index import lookup_prepared, prepared_frame, present_labels, brightness_bounds, filter_frame, brightness_histogram
+from pipeline_profiler import enable_profiling, profiling_enabled, get_records, timings_frame
+
+MAP_COLUMNS = ['latitude', 'longitude', 'brightness', 'cluster_mapping', 'risk_label', 'color']
+MAP_MAX_CELLS = 20000
+WATER_SITES_FILE = "water_resources.csv"
+WATER_COLUMNS = ['nearest_water_km', 'nearest_water_name']
 
 # New function to create a brightness histogram by cluster
-def create_brightness_histogram(dataframe):
-    fig = px.histogram(
-        dataframe, 
-        x="brightness", 
+# counts come pre-binned from the filter index (brightness_histogram), so only the bars reach the browser
+def create_brightness_histogram(counts):
+    fig = px.bar(
+        counts,
+        x="bin_center",
+        y="count",
         color="risk_label",
-        nbins=30,
         opacity=0.7,
         barmode="overlay",
         title="Distribution of Brightness Values by Risk Level",
-        labels={"brightness": "Brightness", "count": "Number of Observations"}
+        labels={"bin_center": "Brightness", "count": "Number of Observations"}
     )
-    fig.update_layout(legend_title="Risk Level")
+    fig.update_traces(width=float(counts['bin_end'].iloc[0] - counts['bin_start'].iloc[0]) if len(counts) else None)
+    fig.update_layout(legend_title="Risk Level", bargap=0)
     return fig
 
 def main():
@@ -47,31 +43,89 @@ def main():
     st.write("This dashboard displays wildfire risk data across different regions.")
 
     st.sidebar.header("Data Input")
-    data_mode = st.sidebar.radio("Choose data source:", ["Use default file", "Upload by URL"])
+    # stages that run during this rerun are recorded and listed at the bottom of the page
+    record_timings = st.sidebar.checkbox("Record pipeline timings", value=profiling_enabled())
+    enable_profiling(record_timings, log_path=os.environ.get("WILDFIRE_PROFILE_LOG"))
+    run_started = time.time()
+    # the published refresh (see refresh_service.py) is preferred when the service is running
+    has_published = read_manifest() is not None
+    data_mode = st.sidebar.radio("Choose data source:", ["Latest published refresh", "Use default file", "Upload by URL"],
+                                 index=0 if has_published else 1)
+
+    water_path = st.sidebar.text_input("Water sites CSV (name, latitude, longitude)",
+                                       value=WATER_SITES_FILE if os.path.exists(WATER_SITES_FILE) else "")
 
     df, model, silhouette, cluster_stats = None, None, None, None
+    plot_path = "wildfire_summary_plot.png"
+    grid = None
+    dataset_key = None # identifies the loaded data, so its filter index is built once (None: rebuild every rerun)
+    # when the prepared frame of this data is already memoised the loaded frames are only read,
+    # so they are taken from the caches as they are instead of being copied on every rerun
+    prepared = None
 
-    if data_mode == "Use default file":
+    if data_mode == "Latest published refresh":
+        if has_published:
+            prepared = lookup_prepared((("published", read_manifest()["version"]), water_path))
+        df, cluster_stats, manifest = load_published(copy=prepared is None)
+        if df is None:
+            st.warning("Nothing has been published yet, start refresh_service.py or pick another source.")
+            return
+        silhouette = manifest["silhouette"]
+        plot_path = published_path(manifest, "plot")
+        grid = load_published_grid(manifest)
+        dataset_key = ("published", manifest["version"])
+        st.caption(f"Published {manifest['created_at']} from {manifest['source']} ({manifest['rows']} rows)")
+
+    elif data_mode == "Use default file":
         file_path = "MODIS_C6_1_USA_contiguous_and_Hawaii_24h.csv"
-        df, model, silhouette, cluster_stats = main_wf(file_path)
+        try:
+            # converted once, then memory mapped on every later load
+            file_path = ensure_columnar(file_path)
+        except ImportError as e:
+            st.sidebar.info(f"Reading the CSV directly: {e}")
+        # cached on the file contents + parameters, so widget changes do not refit the model;
+        # the saved model is loaded and only refit when the detections drift away from it
+        prepared = lookup_prepared((("file", file_fingerprint(file_path), read_current(REGISTRY_DIR)), water_path))
+        df, model, silhouette, cluster_stats = cached_main_wf(file_path, as_geodataframe=False, registry_dir=REGISTRY_DIR,
+                                                              copy=prepared is None)
+        dataset_key = ("file", file_fingerprint(file_path), (df.attrs.get('model') or {}).get('version'))
 
     elif data_mode == "Upload by URL":
         url = st.sidebar.text_input("Enter CSV URL:")
         if st.sidebar.button("Load Data from URL"):
-            df, model, silhouette, cluster_stats = auto_update_and_train(url)
+            st.session_state["loaded_url"] = url
+        # remembered across reruns; the cache makes repeat loads of an unchanged URL cheap
+        if st.session_state.get("loaded_url"):
+            loaded_url = st.session_state["loaded_url"]
+            try:
+                fingerprint = url_fingerprint(loaded_url)
+            except Exception as e:
+                print("Could not fingerprint URL, skipping cache:", e)
+                fingerprint = None
+            # without ETag/Last-Modified the data cannot be identified, and it is downloaded again anyway
+            if fingerprint is not None:
+                dataset_key = ("url", loaded_url, fingerprint)
+                prepared = lookup_prepared((dataset_key, water_path))
+            df, model, silhouette, cluster_stats = cached_auto_update_and_train(loaded_url, as_geodataframe=False,
+                                                                                fingerprint=fingerprint, copy=prepared is None)
             if df is None:
                 st.error("Failed to load dataset from the URL.")
                 return
 
+    if st.sidebar.button("Clear Cached Results"):
+        invalidate_cache()
+        st.sidebar.success("Cached results cleared.")
+
     if df is None:
         st.warning("No data loaded.")
         return
 
-    # water_df = load_water_resources(..., ...)
-    df["geometry"] = df["geometry"].apply(lambda geom: geom.wkt if geom is not None else None)
-
     if silhouette is not None:
         st.markdown(f"**KMeans Silhouette Score:** {silhouette:.3f}")
+    model_info = df.attrs.get('model')
+    if model_info:
+        st.caption(f"Model version {model_info['version']} · " + ("refit on this data" if model_info['refit']
+                   else f"predicted with the saved model (drift {model_info['drift']:.3f})"))
 
     if not cluster_stats.empty:
         st.subheader("Cluster Summary Statistics")
@@ -84,7 +138,7 @@ def main():
     st.subheader("Wildfire Brightness vs FRP Scatter Plot")
 
     try:
-        st.image("wildfire_summary_plot.png", caption="Wildfire Brightness vs Fire Radiative Power (FRP)", use_container_width=True)
+        st.image(plot_path, caption="Wildfire Brightness vs Fire Radiative Power (FRP)", use_container_width=True)
     except Exception as e:
         st.error(f"Failed to load wildfire summary plot: {e}")
 
@@ -93,56 +147,110 @@ def main():
 
     st.sidebar.header("Controls")
     number = st.sidebar.slider("Number of Clusters", min_value=2, max_value=20, value=9)
+    auto_k = st.sidebar.checkbox("Choose number of clusters automatically")
     
     #Added retrain model button
-    if st.sidebar.button("Retrain Model"):
-        df, model, _ = run_model(df, clusters=number)
+    retrained = st.sidebar.button("Retrain Model")
+    if retrained and auto_k:
+        # sweeps k = 2..20 in parallel worker processes and keeps the best silhouette
+        df, model, _ = run_model(df.copy(), clusters="auto", k_range=range(2, 21))
+        k_scores = pd.DataFrame(df.attrs['k_scores'])
+        st.success(f"Model retrained successfully with {model.n_clusters} clusters (chosen automatically)!")
+        st.line_chart(k_scores.set_index('k')[['silhouette']])
+        st.line_chart(k_scores.set_index('k')[['inertia']])
+        elbow = k_scores.loc[k_scores['elbow'], 'k']
+        if len(elbow):
+            st.caption(f"Inertia elbow at k={int(elbow.iloc[0])}")
+    elif retrained:
+        df, model, _ = run_model(df.copy(), clusters=number)
         st.success(f"Model retrained successfully with {number} clusters!")
     
-    df['cluster_mapping'] = df['cluster_mapping'].astype(str)
+    def prepare(df):
+        # the map only needs latitude/longitude; geometries (if any) are shown as WKT, converted in one call
+        if "geometry" in df.columns:
+            df["geometry"] = df["geometry"].to_wkt()
+        # nearest water site per detection, over every site in the file (indexed once, see water_index.py)
+        if water_path:
+            try:
+                df = add_nearest_water(df, load_water_index(water_path))
+            except Exception as e:
+                st.sidebar.error(f"Failed to load water sites: {e}")
+        # Label each cluster once from its mean brightness, then broadcast the labels to the rows
+        df['risk_label'] = cluster_risk_labels(df)
+        # same shared palette as the backend, one small code per row
+        df['color'] = cluster_color_column(df['cluster_mapping'])
+        return df
 
-    cluster_brightness = df.groupby('cluster_mapping')['brightness'].mean()
-    df['risk_label'] = df['cluster_mapping'].apply(lambda cid: label_cluster(cid, cluster_brightness))
-
-    unique = sorted(df['cluster_mapping'].unique())
-    cluster_colors = generate_cluster_colors(unique)
-    df['color'] = df['cluster_mapping'].map(cluster_colors)
+    # rows grouped by risk label and sorted by brightness, built once per dataset (see filter_index.py),
+    # so the filters below are binary searches and slices instead of full-table masks
+    if retrained or prepared is None:
+        prepared = prepared_frame(None if retrained else (dataset_key, water_path), df, prepare)
+    df, filters = prepared
+    has_water = 'nearest_water_km' in df.columns
+    full_rows = len(df)
 
     #Added cluster filter
+    risk_options = present_labels(filters)
     selected_risks = st.sidebar.multiselect(
         "Select Risk Levels to Display",
-        options=df['risk_label'].unique(),
-        default=df['risk_label'].unique()
+        options=risk_options,
+        default=risk_options
     )
-    df = df[df['risk_label'].isin(selected_risks)]
 
-    min_brightness = float(df['brightness'].min())
-    max_brightness = float(df['brightness'].max())
+    min_brightness, max_brightness = brightness_bounds(filters, selected_risks) or brightness_bounds(filters)
     brightness_range = st.sidebar.slider("Brightness Range", min_brightness, max_brightness, (min_brightness, max_brightness))
-    df = df[(df['brightness'] >= brightness_range[0]) & (df['brightness'] <= brightness_range[1])]
+    df = filter_frame(df, filters, selected_risks, *brightness_range)
 
     map_theme = st.sidebar.selectbox("Map Theme", ["Dark", "Light"])
+    max_points = st.sidebar.number_input("Max detections drawn individually", min_value=1000, value=100000, step=10000)
 
     st.subheader("Clustered Wildfire Map")
-    st.pydeck_chart(pdk.Deck(
+    started = time.perf_counter()
+    if len(df) > max_points:
+        # too many points for the browser: draw one marker per grid cell instead
+        if grid is not None and len(df) == full_rows and not retrained:
+            cells = pyramid_level(grid, MAP_MAX_CELLS)
+        else:
+            cells = aggregate_grid(df, choose_resolution(df, MAP_MAX_CELLS))
+        resolution = cells.attrs['resolution']
+        map_layer = pdk.Layer(
+            "ScatterplotLayer",
+            data=add_cell_colors(cells),
+            get_position="[longitude, latitude]",
+            get_color="color",
+            get_radius=cell_radius_m(resolution),
+            pickable=True,
+        )
+        tooltip = {"text": "Detections: {count}\nMax brightness: {max_brightness}\nMean FRP: {mean_frp}\nRisk: {risk_label}"}
+        map_note = f"{len(cells)} grid cells of {resolution}° for {len(df)} detections"
+    else:
+        map_layer = pdk.Layer(
+            "ScatterplotLayer",
+            data=df[MAP_COLUMNS + (WATER_COLUMNS if has_water else [])], # only what the layer and tooltip use
+            get_position="[longitude, latitude]",
+            get_color="color",
+            get_radius=20000,
+            pickable=True,
+        )
+        tooltip = {"text": "Lat: {latitude}\nLon: {longitude}\nBrightness: {brightness}\nCluster: {cluster_mapping}\nRisk: {risk_label}"
+                           + ("\nNearest water: {nearest_water_name} ({nearest_water_km} km)" if has_water else "")}
+        map_note = f"{len(df)} detections"
+
+    deck = pdk.Deck(
         map_style="mapbox://styles/mapbox/light-v9" if map_theme == "Light" else "mapbox://styles/mapbox/dark-v9",
         initial_view_state=pdk.ViewState(
             latitude=df['latitude'].mean(),
             longitude=df['longitude'].mean(),
             zoom=3,
         ),
-        layers=[
-            pdk.Layer(
-                "ScatterplotLayer",
-                data=df,
-                get_position="[longitude, latitude]",
-                get_color="color",
-                get_radius=20000,
-                pickable=True,
-            )
-        ],
-        tooltip={"text": "Lat: {latitude}\nLon: {longitude}\nBrightness: {brightness}\nCluster: {cluster_mapping}\nRisk: {risk_label}"}
-    ))
+        layers=[map_layer],
+        tooltip=tooltip
+    )
+    st.pydeck_chart(deck)
+    if record_timings:
+        # serialising the deck again costs as much as sending it, so the size is only measured on request
+        map_note += f" · map payload {len(deck.to_json().encode('utf-8')) / 1024:.0f} KiB"
+    st.caption(f"{map_note} · built and sent in {(time.perf_counter() - started) * 1000:.0f} ms")
 
     st.markdown("---")
     st.subheader("Processed Wildfire Data")
@@ -156,8 +264,28 @@ def main():
 
     st.markdown("---")
     st.subheader("Brightness Distribution by Risk Level")
-    histogram = create_brightness_histogram(df)
+    histogram = create_brightness_histogram(brightness_histogram(filters, selected_risks, *brightness_range))
     st.plotly_chart(histogram, use_container_width=True)
 
+    # history kept by the refresh service (--archive-dir), read from the small daily summaries only
+    archive_days = list_archive_days(ARCHIVE_DIR)
+    if archive_days:
+        st.markdown("---")
+        st.subheader("Detection Trends")
+        window_days = st.sidebar.slider("Trend rolling window (days)", min_value=1, max_value=28, value=7)
+        trends = rolling_trends(load_daily_summaries(archive_dir=ARCHIVE_DIR), window_days=window_days)
+        st.caption(f"{len(archive_days)} archived days, {archive_days[0]} to {archive_days[-1]}")
+        st.line_chart(trends[['detections', 'detections_rolling']])
+        st.line_chart(trends[['avg_risk', 'avg_risk_rolling']])
+
+    if record_timings:
+        with st.expander("Pipeline timings"):
+            timings = timings_frame(get_records(since=run_started))
+            if timings.empty:
+                st.caption("No pipeline stage ran on this rerun (results came from the cache).")
+            else:
+                st.dataframe(timings, use_container_width=True)
+                st.caption(f"Total {timings.loc[timings['parent'].isna(), 'wall_s'].sum():.3f}s across top-level stages")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,7 @@
 import unittest
-import matplotlib.pyplot as plt
-from frontend_risk_display import generate_cluster_colors
-from frontend_risk_display import label_cluster
+import pandas as pd
+from backend_processing import generate_cluster_colors
+from backend_processing import cluster_risk_labels
 
 class TestFrontendRiskDisplay(unittest.TestCase):
 
@@ -42,27 +42,27 @@ class TestFrontendRiskDisplay(unittest.TestCase):
         colors = {tuple(val) for val in color_gen.values()}
         self.assertEqual(len(colors), len(cluster_ids))
 
-class TestLabelCluster(unittest.TestCase):
+class TestClusterRiskLabels(unittest.TestCase):
+    # the dashboard labels every row from the mean brightness of its cluster
+    def label(self, brightness):
+        df = pd.DataFrame({'cluster_mapping': [0] * len(brightness), 'brightness': brightness})
+        return cluster_risk_labels(df)[0]
+
     def test_high_risk(self):
-        brightness_map = {'A': 401}
-        self.assertEqual(label_cluster('A', brightness_map), "High Risk")
+        self.assertEqual(self.label([401]), "High Risk")
 
     def test_medium_risk_upper_bound(self):
-        brightness_map = {'B': 399}
-        self.assertEqual(label_cluster('B', brightness_map), "Medium Risk")
+        self.assertEqual(self.label([399]), "Medium Risk")
 
     def test_medium_risk_lower_bound(self):
-        brightness_map = {'C': 201}
-        self.assertEqual(label_cluster('C', brightness_map), "Medium Risk")
+        self.assertEqual(self.label([201]), "Medium Risk")
 
     def test_low_risk_upper_bound(self):
-        brightness_map = {'D': 199}
-        self.assertEqual(label_cluster('D', brightness_map), "Low Risk")
+        self.assertEqual(self.label([199]), "Low Risk")
 
-    def test_missing_cluster_id(self):
-        brightness_map = {}
-        self.assertEqual(label_cluster('Z', brightness_map), "Low Risk")  
-        # default to 0 brightness
+    def test_cluster_mean_decides(self):
+        df = pd.DataFrame({'cluster_mapping': [0, 0, 1, 1], 'brightness': [150, 270, 390, 420]})
+        self.assertEqual(list(cluster_risk_labels(df)), ["Medium Risk", "Medium Risk", "High Risk", "High Risk"])
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
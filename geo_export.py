@@ -0,0 +1,120 @@
+import os
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline_profiler import profile_stage
+
+"""
+geo_export.py
+
+Description:
+    Writes point features straight from the latitude/longitude arrays, without
+    building a GeoDataFrame or going through the per-feature OGR writer.
+    GeoJSON is streamed chunk by chunk using pandas' JSON encoder for the
+    properties; GeoParquet stores the points as WKB assembled with numpy.
+    Both report the export time and the size of the written file.
+"""
+
+WKB_POINT = np.dtype([("order", "u1"), ("type", "<u4"), ("x", "<f8"), ("y", "<f8")])
+
+
+def _property_frame(dataframe):
+    return dataframe.drop(columns=[column for column in ("geometry",) if column in dataframe.columns])
+
+def _report(kind, path, rows, started):
+    stats = {"path": path, "rows": int(rows), "bytes": os.path.getsize(path), "seconds": time.perf_counter() - started}
+    print(f"{kind} export: {stats['rows']} features, {stats['bytes'] / 2**20:.2f} MiB in {stats['seconds']:.3f}s -> {path}")
+    return stats
+
+@profile_stage()
+def export_geojson(dataframe, path, chunksize=100000):
+    """
+    Streams the rows of dataframe as GeoJSON Point features (RFC 7946, WGS84 lon/lat).
+    Every column except geometry becomes a property. Returns the export stats dict.
+    """
+    started = time.perf_counter()
+    properties = _property_frame(dataframe)
+    longitudes = dataframe["longitude"].to_numpy(dtype=float)
+    latitudes = dataframe["latitude"].to_numpy(dtype=float)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write('{"type":"FeatureCollection","features":[\n')
+        for start in range(0, len(dataframe), chunksize):
+            stop = min(start + chunksize, len(dataframe))
+            records = properties.iloc[start:stop].to_json(orient="records", lines=True, date_format="iso").splitlines()
+            features = [
+                f'{{"type":"Feature","geometry":{{"type":"Point","coordinates":[{x!r},{y!r}]}},"properties":{record}}}'
+                for x, y, record in zip(longitudes[start:stop].tolist(), latitudes[start:stop].tolist(), records)
+            ]
+            if start:
+                handle.write(",\n")
+            handle.write(",\n".join(features))
+        handle.write("\n]}\n")
+    return _report("GeoJSON", path, len(dataframe), started)
+
+def _arrow_table(dataframe):
+    # Parquet cannot store dictionaries of lists, so palette-backed color columns
+    # (categoricals of RGBA tuples) are written as fixed-size uint8 lists instead
+    import pyarrow as pa
+    palette_columns = [column for column in dataframe.columns
+                       if isinstance(dataframe[column].dtype, pd.CategoricalDtype)
+                       and len(dataframe[column].cat.categories)
+                       and isinstance(dataframe[column].cat.categories[0], tuple)]
+    table = pa.Table.from_pandas(dataframe.drop(columns=palette_columns), preserve_index=False)
+    for column in palette_columns:
+        values = dataframe[column]
+        palette = np.array(values.cat.categories.tolist(), dtype=np.uint8)
+        rgba = palette[values.cat.codes.to_numpy()]
+        table = table.append_column(column, pa.FixedSizeListArray.from_arrays(pa.array(rgba.reshape(-1)), palette.shape[1]))
+    return table
+
+def points_to_wkb(longitudes, latitudes):
+    """
+    Little-endian WKB for each point as a pyarrow binary array, built without a Python loop.
+    """
+    import pyarrow as pa
+    points = np.empty(len(longitudes), dtype=WKB_POINT)
+    points["order"] = 1
+    points["type"] = 1
+    points["x"] = longitudes
+    points["y"] = latitudes
+    offsets = np.arange(0, WKB_POINT.itemsize * (len(points) + 1), WKB_POINT.itemsize, dtype=np.int32)
+    return pa.Array.from_buffers(pa.binary(), len(points), [None, pa.py_buffer(offsets), pa.py_buffer(points.tobytes())])
+
+@profile_stage()
+def export_geoparquet(dataframe, path):
+    """
+    Writes the rows as GeoParquet 1.0 with a WKB point geometry column. Returns the export stats dict.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    started = time.perf_counter()
+    longitudes = dataframe["longitude"].to_numpy(dtype=float)
+    latitudes = dataframe["latitude"].to_numpy(dtype=float)
+    table = _arrow_table(_property_frame(dataframe))
+    table = table.append_column("geometry", points_to_wkb(longitudes, latitudes))
+    bbox = [float(longitudes.min()), float(latitudes.min()), float(longitudes.max()), float(latitudes.max())] if len(dataframe) else []
+    geo_metadata = {
+        "version": "1.0.0",
+        "primary_column": "geometry",
+        "columns": {"geometry": {"encoding": "WKB", "geometry_types": ["Point"], "bbox": bbox}},
+    }
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"geo": json.dumps(geo_metadata).encode()})
+    pq.write_table(table, path)
+    return _report("GeoParquet", path, len(dataframe), started)
+
+def read_geoparquet(path, columns=None, geometry=False):
+    """
+    Reads a GeoParquet export. Geometry objects are only built when geometry=True
+    (returns a GeoDataFrame); otherwise the WKB column is skipped and a plain
+    DataFrame with latitude/longitude is returned.
+    """
+    if geometry:
+        import geopandas as gpd
+        return gpd.read_parquet(path, columns=columns)
+    if columns is None:
+        import pyarrow.parquet as pq
+        columns = [name for name in pq.read_schema(path).names if name != "geometry"]
+    return pd.read_parquet(path, columns=columns)
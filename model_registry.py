@@ -0,0 +1,152 @@
+import os
+import json
+import pickle
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+"""
+model_registry.py
+
+Description:
+    Saves fitted clustering models (with their scaler as model.scaler_) to
+    disk together with metadata: number of clusters, silhouette score,
+    training window and the distribution of the distances between the
+    training detections and their assigned centroid. current.json points at
+    the version in use and is swapped atomically, like the published
+    artifacts in refresh_service.py.
+
+    Later detections are assigned with predict() against the saved
+    centroids; the population stability index (PSI) of their assignment
+    distances against the training distribution tells when the data has
+    moved far enough from the model that it should be refit.
+"""
+
+REGISTRY_DIR = "model_registry"
+CURRENT_FILE = "current.json"
+MODEL_FILE = "model.pkl"
+METADATA_FILE = "metadata.json"
+DRIFT_THRESHOLD = 0.2 # PSI above 0.2 is the usual "significant shift" rule of thumb
+DISTANCE_BINS = 10
+
+_loaded_models = {}
+
+
+def assignment_distances(model, coordinates_scaled):
+    """
+    Cluster of every point and its distance to that cluster's centroid (in the scaled space).
+    """
+    # predict needs the dtype the model was fitted with (a float32 columnar store vs a float64 CSV)
+    coordinates_scaled = np.asarray(coordinates_scaled, dtype=model.cluster_centers_.dtype)
+    labels = model.predict(coordinates_scaled)
+    distances = np.linalg.norm(coordinates_scaled - model.cluster_centers_[labels], axis=1)
+    return labels, distances
+
+def distance_edges(distances, bins=DISTANCE_BINS):
+    # inner quantile edges splitting the reference distances into equally populated bins
+    return np.quantile(distances, np.linspace(0, 1, bins + 1)[1:-1]).tolist()
+
+def population_stability(edges, distances):
+    """
+    PSI of distances against the equally populated bins described by edges:
+    0 for the training distribution, above ~0.2 for a significant shift.
+    """
+    if len(distances) == 0:
+        return 0.0
+    bins = len(edges) + 1
+    observed = np.bincount(np.searchsorted(edges, distances, side="right"), minlength=bins) / len(distances)
+    observed = np.maximum(observed, 1e-4)
+    expected = 1.0 / bins
+    return float(np.sum((observed - expected) * np.log(observed / expected)))
+
+def _centers_in_degrees(model):
+    scaler = getattr(model, "scaler_", None)
+    return scaler.inverse_transform(model.cluster_centers_) if scaler is not None else model.cluster_centers_
+
+def align_clusters(model, reference_model):
+    """
+    Renumbers the clusters of a freshly fitted model so each one takes the id of the
+    closest reference centroid (optimal one-to-one matching on the centroids in degrees),
+    which keeps cluster ids and colors stable across refits. Ids always stay 0..k-1, so
+    when k shrinks the matched clusters keep the order of their reference ids instead.
+    The model is updated in place.
+    Returns the old id -> new id lookup array.
+    """
+    centers = _centers_in_degrees(model)
+    reference = _centers_in_degrees(reference_model)
+    cost = np.linalg.norm(centers[:, None, :] - reference[None, :, :], axis=2)
+    rows, cols = linear_sum_assignment(cost)
+    mapping = np.full(len(centers), -1, dtype=np.int64)
+    mapping[rows] = cols
+    # clusters beyond the reference count get the unused ids in order
+    unused = [i for i in range(len(centers)) if i not in set(cols)]
+    mapping[mapping == -1] = unused[:int((mapping == -1).sum())]
+    # with fewer clusters than the reference, matched ids can reach past k - 1; they are
+    # compacted to 0..k-1 in the same order, so the model's ids stay those it predicts
+    mapping = np.argsort(np.argsort(mapping, kind="stable"), kind="stable")
+    order = np.argsort(mapping)
+    model.cluster_centers_ = model.cluster_centers_[order]
+    if hasattr(model, "labels_"):
+        model.labels_ = mapping[model.labels_]
+    return mapping
+
+def read_current(registry_dir=REGISTRY_DIR):
+    path = os.path.join(registry_dir, CURRENT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return json.load(handle)["version"]
+
+def save_model(model, metadata, registry_dir=REGISTRY_DIR, keep_versions=5):
+    """
+    Stores model (and its scaler_) as a new version with metadata and makes it current.
+    Returns the metadata with its version and created_at filled in.
+    """
+    os.makedirs(registry_dir, exist_ok=True)
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    metadata = {**metadata, "version": version, "created_at": datetime.now(timezone.utc).isoformat()}
+    staging_dir = tempfile.mkdtemp(dir=registry_dir, prefix=".staging-")
+    with open(os.path.join(staging_dir, MODEL_FILE), "wb") as handle:
+        pickle.dump(model, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(os.path.join(staging_dir, METADATA_FILE), "w") as handle:
+        json.dump(metadata, handle, indent=2, default=str)
+    os.rename(staging_dir, os.path.join(registry_dir, version))
+
+    temp_current = os.path.join(registry_dir, f".{CURRENT_FILE}.tmp")
+    with open(temp_current, "w") as handle:
+        json.dump({"version": version}, handle)
+    os.replace(temp_current, os.path.join(registry_dir, CURRENT_FILE))
+    print(f"Saved model version {version} ({metadata.get('k')} clusters) to {registry_dir}")
+
+    versions = list_versions(registry_dir)
+    for name in versions[:-keep_versions]:
+        shutil.rmtree(os.path.join(registry_dir, name), ignore_errors=True)
+    return metadata
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(name for name in os.listdir(registry_dir)
+                  if not name.startswith(".") and os.path.isdir(os.path.join(registry_dir, name)))
+
+def load_model(registry_dir=REGISTRY_DIR, version=None):
+    """
+    Loads a saved version (the current one by default).
+    Returns (model, metadata), or (None, None) when the registry is empty.
+    """
+    version = version or read_current(registry_dir)
+    if version is None:
+        return None, None
+    # saved versions never change, so each one is unpickled once per process
+    key = (os.path.abspath(registry_dir), version)
+    if key not in _loaded_models:
+        version_dir = os.path.join(registry_dir, version)
+        with open(os.path.join(version_dir, MODEL_FILE), "rb") as handle:
+            model = pickle.load(handle)
+        with open(os.path.join(version_dir, METADATA_FILE)) as handle:
+            metadata = json.load(handle)
+        _loaded_models[key] = (model, metadata)
+    return _loaded_models[key]
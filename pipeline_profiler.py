@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+
+"""
+pipeline_profiler.py
+
+Description:
+    Lightweight per-stage instrumentation for the pipeline. Functions wrapped
+    with @profile_stage (and blocks inside a `with stage(...)`) record wall
+    time, CPU time, rows in/out and the change in resident memory, and emit
+    each record as one JSON line. Profiling is off by default and a disabled
+    stage costs a single flag check; turn it on with enable_profiling() or
+    by setting WILDFIRE_PROFILE=1 (WILDFIRE_PROFILE_LOG=<file> appends the
+    JSON lines to a file instead of printing them).
+"""
+
+MAX_RECORDS = 1000
+
+_enabled = os.environ.get("WILDFIRE_PROFILE", "") not in ("", "0")
+_log_path = os.environ.get("WILDFIRE_PROFILE_LOG") or None
+_records = deque(maxlen=MAX_RECORDS)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable_profiling(enabled=True, log_path=None):
+    """
+    Turns recording on or off. log_path: file the JSON lines are appended to
+    (None prints them to stdout).
+    """
+    global _enabled, _log_path
+    _enabled = enabled
+    _log_path = log_path
+
+def profiling_enabled():
+    return _enabled
+
+def _rss_bytes():
+    # current resident set size; /proc is cheap to read, elsewhere fall back to the peak
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+def count_rows(value):
+    # rows of a frame, or of the first frame in a returned tuple; None for anything else
+    if isinstance(value, tuple):
+        value = next((item for item in value if isinstance(item, pd.DataFrame)), None)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+def _emit(record):
+    with _lock:
+        _records.append(record)
+        line = json.dumps(record, default=str)
+        if _log_path:
+            with open(_log_path, "a") as handle:
+                handle.write(line + "\n")
+        else:
+            print(line)
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    Records the enclosed block as stage name. Yields the record dict (or None when
+    profiling is off) so the block can set record['rows_out'] itself.
+    """
+    if not _enabled:
+        yield None
+        return
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    record = {"stage": name, "parent": stack[-1] if stack else None, "rows_in": rows_in, "rows_out": None}
+    stack.append(name)
+    rss_before = _rss_bytes()
+    started, cpu_started = time.perf_counter(), time.process_time()
+    try:
+        yield record
+        record["status"] = "ok"
+    except BaseException as e:
+        record["status"] = f"error: {type(e).__name__}"
+        raise
+    finally:
+        record["wall_s"] = round(time.perf_counter() - started, 6)
+        record["cpu_s"] = round(time.process_time() - cpu_started, 6)
+        record["mem_delta_mb"] = round((_rss_bytes() - rss_before) / 2**20, 3)
+        record["ts"] = time.time()
+        stack.pop()
+        _emit(record)
+
+def profile_stage(name=None):
+    """
+    Decorator recording every call of the function as a stage (named after the
+    function by default). Rows in come from the first DataFrame argument.
+    """
+    def decorator(function):
+        stage_name = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            rows_in = next((len(arg) for arg in args if isinstance(arg, pd.DataFrame)), None)
+            with stage(stage_name, rows_in=rows_in) as record:
+                result = function(*args, **kwargs)
+                record["rows_out"] = count_rows(result)
+            return result
+        return wrapper
+    return decorator
+
+def get_records(since=None):
+    """
+    Recorded stages (oldest first), optionally only those that finished after the
+    time.time() value since.
+    """
+    with _lock:
+        records = list(_records)
+    if since is not None:
+        records = [record for record in records if record["ts"] >= since]
+    return records
+
+def clear_records():
+    with _lock:
+        _records.clear()
+
+def timings_frame(records=None):
+    """
+    Records as a DataFrame in the order the stages finished, for display.
+    """
+    columns = ["stage", "parent", "wall_s", "cpu_s", "rows_in", "rows_out", "mem_delta_mb", "status"]
+    return pd.DataFrame(get_records() if records is None else records, columns=columns)
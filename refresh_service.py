@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import threading
+from datetime import datetime, timezone
+
+import geopandas as gpd
+import pandas as pd
+
+import backend_processing
+from geo_export import export_geojson, export_geoparquet, read_geoparquet
+from spatial_aggregation import build_grid_pyramid
+from detection_archive import append_detections
+from summary_plot import PLOT_CACHE_DIR
+from pipeline_profiler import enable_profiling, profiling_enabled, get_records
+
+"""
+refresh_service.py
+
+Description:
+    Long-running refresh loop around the backend pipeline. Every interval it
+    re-runs main_wf (local file) or auto_update_and_train (URL) and publishes
+    the GeoJSON, the summary plot and the cluster statistics atomically:
+    each run is written into a fresh version directory and only then is
+    current.json swapped to point at it, so the dashboard never reads a
+    half-written or mixed set of files.
+
+    Run it next to the dashboard with:
+        python3 refresh_service.py --source <csv path or url> --interval 600
+"""
+
+PUBLISH_DIR = "published"
+MANIFEST_FILE = "current.json"
+GEOJSON_FILE = "processed_wildfire_usable.json"
+GEOPARQUET_FILE = "processed_wildfire_usable.parquet"
+PLOT_FILE = "wildfire_summary_plot.png"
+STATS_FILE = "cluster_stats.csv"
+GRID_FILE = "grid_pyramid.parquet"
+
+_published_cache = {}
+_published_grid_cache = {}
+
+
+def _is_url(source):
+    return source.startswith(("http://", "https://", "file://"))
+
+def refresh_once(source, output_dir=PUBLISH_DIR, clusters=10, silhouette="auto", keep_versions=3, archive_dir=None,
+                 registry_dir=None, plot_cache_dir=PLOT_CACHE_DIR):
+    """
+    Runs the pipeline once and publishes the result. Returns the new manifest,
+    or None when the run failed (the previously published version stays current).
+    archive_dir: when given, the clustered detections are also added to the
+        date-partitioned archive (see detection_archive.py).
+    registry_dir: when given, the saved model is reused and only refit on drift (see model_registry.py).
+    plot_cache_dir: where rendered summary plots are kept (see summary_plot.py), None to always redraw.
+    """
+    run_started = time.time()
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    staging_dir = os.path.join(output_dir, f".staging-{version}")
+    os.makedirs(staging_dir)
+    try:
+        geojson_path = os.path.join(staging_dir, GEOJSON_FILE)
+        plot_path = os.path.join(staging_dir, PLOT_FILE)
+        exports = {}
+        if _is_url(source):
+            # the GeoJSON is exported below for both sources, so its stats land in the manifest
+            geo_df, model, score, cluster_stats = backend_processing.auto_update_and_train(
+                source, clusters=clusters, output_geojson=None, silhouette=silhouette, as_geodataframe=False,
+                registry_dir=registry_dir)
+            if geo_df is None:
+                raise RuntimeError(f"no data from {source}")
+            backend_processing.plot_wildfire_summary(geo_df, output_path=plot_path, cache_dir=plot_cache_dir)
+        else:
+            geo_df, model, score, cluster_stats = backend_processing.main_wf(
+                source, clusters=clusters, silhouette=silhouette, plot_path=plot_path, as_geodataframe=False,
+                registry_dir=registry_dir, plot_cache_dir=plot_cache_dir)
+        exports["geojson"] = export_geojson(geo_df, geojson_path)
+        exports["geoparquet"] = export_geoparquet(geo_df, os.path.join(staging_dir, GEOPARQUET_FILE))
+        cluster_stats.to_csv(os.path.join(staging_dir, STATS_FILE), index=False)
+        # map aggregation levels for large point counts (see spatial_aggregation.py), using the
+        # same cluster-level risk labels the dashboard shows
+        build_grid_pyramid(geo_df.assign(risk_label=backend_processing.cluster_risk_labels(geo_df))).to_parquet(
+            os.path.join(staging_dir, GRID_FILE), index=False)
+    except Exception as e:
+        print("Refresh failed, keeping the last published version:", e)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        return None
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "source": source,
+        "rows": int(len(geo_df)),
+        "clusters": clusters,
+        "silhouette": score,
+        "model": geo_df.attrs.get("model"),
+        "files": {"geojson": GEOJSON_FILE, "geoparquet": GEOPARQUET_FILE, "plot": PLOT_FILE, "cluster_stats": STATS_FILE,
+                  "grid": GRID_FILE},
+        "exports": {kind: {"bytes": stats["bytes"], "seconds": stats["seconds"]} for kind, stats in exports.items()},
+    }
+    if profiling_enabled(): # per-stage timings of this run (see pipeline_profiler.py)
+        manifest["timings"] = get_records(since=run_started)
+    # the directory rename and the manifest replace are both atomic on one filesystem
+    os.rename(staging_dir, os.path.join(output_dir, version))
+    temp_manifest = os.path.join(output_dir, f".{MANIFEST_FILE}.tmp")
+    with open(temp_manifest, "w") as handle:
+        json.dump(manifest, handle, indent=2)
+    os.replace(temp_manifest, os.path.join(output_dir, MANIFEST_FILE))
+    print(f"Published version {version} ({manifest['rows']} rows) to {output_dir}")
+    if archive_dir and 'acq_date' in geo_df.columns:
+        try:
+            append_detections(geo_df, archive_dir)
+        except Exception as e:
+            print("Archiving failed, the published version is unaffected:", e)
+    _prune_versions(output_dir, keep_versions)
+    return manifest
+
+def _prune_versions(output_dir, keep_versions):
+    # older versions are kept for a while so a reader that already opened the manifest can finish
+    versions = sorted(name for name in os.listdir(output_dir)
+                      if not name.startswith(".") and os.path.isdir(os.path.join(output_dir, name)))
+    for name in versions[:-keep_versions]:
+        shutil.rmtree(os.path.join(output_dir, name), ignore_errors=True)
+
+def read_manifest(output_dir=PUBLISH_DIR):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return json.load(handle)
+
+def published_path(manifest, name, output_dir=PUBLISH_DIR):
+    return os.path.join(output_dir, manifest["version"], manifest["files"][name])
+
+def load_published_grid(manifest, output_dir=PUBLISH_DIR):
+    # precomputed aggregation pyramid of a published version, None for versions without one;
+    # read once per version like load_published, callers must not modify it
+    if "grid" not in manifest["files"]:
+        return None
+    key = (os.path.abspath(output_dir), manifest["version"])
+    if key not in _published_grid_cache:
+        _published_grid_cache.clear()
+        _published_grid_cache[key] = pd.read_parquet(published_path(manifest, "grid", output_dir))
+    return _published_grid_cache[key]
+
+def load_published(output_dir=PUBLISH_DIR, copy=True):
+    """
+    Loads the latest published artifacts, from the GeoParquet copy without building
+    geometry objects when the version has one. copy=False returns the parsed frames
+    shared by every caller, which must then not modify them.
+    Returns (geo_df, cluster_stats, manifest), or (None, None, None) if nothing is published yet.
+    """
+    manifest = read_manifest(output_dir)
+    if manifest is None:
+        return None, None, None
+    # a published version never changes, so it is parsed once per process
+    key = (os.path.abspath(output_dir), manifest["version"])
+    if key not in _published_cache:
+        _published_cache.clear()
+        if "geoparquet" in manifest["files"]:
+            geo_df = read_geoparquet(published_path(manifest, "geoparquet", output_dir))
+        else:
+            geo_df = gpd.read_file(published_path(manifest, "geojson", output_dir))
+        _published_cache[key] = (geo_df, pd.read_csv(published_path(manifest, "cluster_stats", output_dir)))
+    geo_df, cluster_stats = _published_cache[key]
+    if not copy:
+        return geo_df, cluster_stats, manifest
+    return geo_df.copy(), cluster_stats.copy(), manifest
+
+def refresh_forever(source, interval=600, output_dir=PUBLISH_DIR, stop_event=None, **kwargs):
+    """
+    Calls refresh_once every interval seconds until stop_event is set.
+    A slow run delays the next one rather than overlapping it.
+    """
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        started = time.monotonic()
+        refresh_once(source, output_dir=output_dir, **kwargs)
+        stop_event.wait(max(0.0, interval - (time.monotonic() - started)))
+
+def start_refresh_service(source, interval=600, output_dir=PUBLISH_DIR, **kwargs):
+    """
+    Runs refresh_forever in a daemon thread. Returns (thread, stop_event); set the event to stop it.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stop_event = threading.Event()
+    thread = threading.Thread(target=refresh_forever, name="wildfire-refresh", daemon=True,
+                              args=(source, interval, output_dir, stop_event), kwargs=kwargs)
+    thread.start()
+    return thread, stop_event
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Periodically refresh and publish the wildfire risk artifacts.")
+    parser.add_argument("--source", default="MODIS_C6_1_USA_contiguous_and_Hawaii_24h.csv", help="CSV path or URL")
+    parser.add_argument("--interval", type=float, default=600, help="seconds between refreshes")
+    parser.add_argument("--output-dir", default=PUBLISH_DIR)
+    parser.add_argument("--clusters", type=int, default=10)
+    parser.add_argument("--once", action="store_true", help="publish a single refresh and exit")
+    parser.add_argument("--archive-dir", default=None, help="also keep every refresh in this date-partitioned archive")
+    parser.add_argument("--registry-dir", default=None, help="reuse the model saved here, refitting only on drift")
+    parser.add_argument("--profile", action="store_true", help="record per-stage timings in the manifest")
+    parser.add_argument("--profile-log", default=None, help="append the stage timings as JSON lines to this file")
+    args = parser.parse_args()
+
+    if args.profile or args.profile_log:
+        enable_profiling(log_path=args.profile_log)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.once:
+        refresh_once(args.source, output_dir=args.output_dir, clusters=args.clusters, archive_dir=args.archive_dir,
+                     registry_dir=args.registry_dir)
+    else:
+        try:
+            refresh_forever(args.source, interval=args.interval, output_dir=args.output_dir, clusters=args.clusters,
+                            archive_dir=args.archive_dir, registry_dir=args.registry_dir)
+        except KeyboardInterrupt:
+            print("Refresh service stopped.")
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import pickle
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import requests
+
+import backend_processing
+from geo_export import export_geojson
+from model_registry import read_current
+from summary_plot import PLOT_CACHE_DIR, PLOT_SUBDIR, clear_plot_cache
+
+"""
+result_cache.py
+
+Description:
+    Two level cache (in-process LRU bounded by MAX_MEMORY_BYTES + on-disk
+    pickles bounded by MAX_DISK_BYTES) for the results of
+    main_wf and auto_update_and_train. Entries are keyed by the content of
+    the input (file hash, or the ETag/Last-Modified of a URL) together with
+    the clustering parameters, so dashboard reruns that do not change the
+    data or the model settings skip loading, clustering and plotting.
+"""
+
+CACHE_DIR = ".wildfire_cache"
+MAX_MEMORY_BYTES = 1024 * 2**20
+MAX_DISK_BYTES = 512 * 2**20
+
+_memory_cache = OrderedDict()
+_memory_sizes = {}
+_fingerprint_memo = {}
+
+
+def file_fingerprint(path): #sha256 of the file contents, memoised on (size, mtime) so reruns do not rehash
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _fingerprint_memo:
+        digest = hashlib.sha256()
+        with open(path, "rb") as handle:
+            for block in iter(lambda: handle.read(2**20), b""):
+                digest.update(block)
+        _fingerprint_memo[memo_key] = "sha256:" + digest.hexdigest()
+    return _fingerprint_memo[memo_key]
+
+def url_fingerprint(url, timeout=10):
+    """
+    Identifies the current version of a remote file from a HEAD request.
+    Returns None when the server sends neither an ETag nor a Last-Modified header,
+    in which case the result cannot be cached safely.
+    """
+    response = requests.head(url, timeout=timeout, allow_redirects=True)
+    response.raise_for_status()
+    etag = response.headers.get("ETag")
+    if etag:
+        return "etag:" + etag
+    modified = response.headers.get("Last-Modified")
+    if modified:
+        return f"modified:{modified}:{response.headers.get('Content-Length', '')}"
+    return None
+
+def cache_key(fingerprint, **params):
+    payload = json.dumps({"source": fingerprint, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _copy_result(result):
+    # callers (e.g. the dashboard) modify the returned frames in place, so never hand out the cached objects
+    return tuple(item.copy() if isinstance(item, pd.DataFrame) else item for item in result)
+
+def _disk_path(key, cache_dir):
+    return os.path.join(cache_dir, key + ".pkl")
+
+def get_cached(key, cache_dir=CACHE_DIR, copy=True):
+    # copy=False hands out the cached objects themselves, for callers that only read them
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        return _copy_result(_memory_cache[key]) if copy else _memory_cache[key]
+    path = _disk_path(key, cache_dir)
+    if cache_dir and os.path.exists(path):
+        try:
+            with open(path, "rb") as handle:
+                result = pickle.load(handle)
+        except Exception as e:
+            print("Discarding unreadable cache entry:", e)
+            os.remove(path)
+            return None
+        os.utime(path) # mark as recently used for disk eviction
+        _remember(key, result)
+        return _copy_result(result) if copy else result
+    return None
+
+def put_cached(key, result, cache_dir=CACHE_DIR, max_disk_bytes=MAX_DISK_BYTES):
+    _remember(key, _copy_result(result))
+    if not cache_dir:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    # write to a temp file first so a crash never leaves a truncated entry behind
+    handle, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(handle, "wb") as temp_file:
+        pickle.dump(result, temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, _disk_path(key, cache_dir))
+    _evict_disk(cache_dir, max_disk_bytes)
+
+def result_bytes(item):
+    """
+    Approximate in-memory size of a cached result: deep memory_usage of frames, nbytes of
+    arrays, and for other objects (fitted models, KD-trees) the arrays they hold.
+    """
+    if isinstance(item, pd.DataFrame):
+        return int(item.memory_usage(deep=True).sum())
+    if isinstance(item, pd.Series):
+        return int(item.memory_usage(deep=True))
+    if isinstance(item, np.ndarray):
+        return item.nbytes
+    if isinstance(item, (tuple, list)):
+        return sum(result_bytes(value) for value in item)
+    if isinstance(item, dict):
+        return sum(result_bytes(value) for value in item.values())
+    # cKDTree keeps its arrays in slots rather than a __dict__
+    attributes = getattr(item, "__dict__", None) or {name: getattr(item, name, None) for name in ("data", "indices")}
+    return sys.getsizeof(item) + sum(value.nbytes for value in attributes.values() if isinstance(value, np.ndarray))
+
+def _remember(key, result, max_bytes=None):
+    # in-process LRU bounded by the size of the entries; the newest one is always kept
+    max_bytes = MAX_MEMORY_BYTES if max_bytes is None else max_bytes
+    _memory_cache[key] = result
+    _memory_cache.move_to_end(key)
+    _memory_sizes[key] = result_bytes(result)
+    total = sum(_memory_sizes.get(cached, 0) for cached in _memory_cache)
+    while total > max_bytes and len(_memory_cache) > 1:
+        oldest, _ = _memory_cache.popitem(last=False)
+        total -= _memory_sizes.pop(oldest, 0)
+
+def _evict_disk(cache_dir, max_disk_bytes):
+    # drop the least recently used entries until the cache fits in max_disk_bytes
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".pkl"):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_disk_bytes:
+            break
+        os.remove(os.path.join(cache_dir, name))
+        total -= size
+
+def invalidate_cache(key=None, cache_dir=CACHE_DIR):
+    """
+    Removes one entry (key) or, with no key, every cached result and rendered plot from memory and disk.
+    """
+    if key is None:
+        _memory_cache.clear()
+        _memory_sizes.clear()
+        if cache_dir and os.path.isdir(cache_dir):
+            for name in os.listdir(cache_dir):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(cache_dir, name))
+            clear_plot_cache(os.path.join(cache_dir, PLOT_SUBDIR))
+        return
+    _memory_cache.pop(key, None)
+    _memory_sizes.pop(key, None)
+    path = _disk_path(key, cache_dir)
+    if cache_dir and os.path.exists(path):
+        os.remove(path)
+
+def cached_main_wf(path, clusters=10, scale_features=True, cache_dir=CACHE_DIR, copy=True, **kwargs):
+    """
+    main_wf with caching. Extra keyword arguments are passed to main_wf and are part of the key.
+    copy=False returns the cached frames on a hit without copying them; they must not be modified.
+    On a hit the summary plot is written again from the cached frame, since plot_path may
+    hold the plot of another input by now; unchanged plots come from the plot cache.
+    """
+    def key():
+        # with a model registry the results also depend on which saved model is current
+        model_version = read_current(kwargs["registry_dir"]) if kwargs.get("registry_dir") else None
+        return cache_key(file_fingerprint(path), fn="main_wf", clusters=clusters, scale_features=scale_features,
+                         model_version=model_version, **kwargs)
+    result = get_cached(key(), cache_dir, copy=copy)
+    if result is not None:
+        backend_processing.plot_wildfire_summary(result[0], output_path=kwargs.get("plot_path", "wildfire_summary_plot.png"),
+                                                 cache_dir=kwargs.get("plot_cache_dir", PLOT_CACHE_DIR))
+        return result
+    result = backend_processing.main_wf(path, clusters=clusters, scale_features=scale_features, **kwargs)
+    put_cached(key(), result, cache_dir) # keyed after the run, which may have saved a new model
+    return result
+
+def cached_auto_update_and_train(url, clusters=10, scale_features=True, output_geojson="processed_wildfire_usable.json",
+                                 cache_dir=CACHE_DIR, fingerprint=None, copy=True, **kwargs):
+    """
+    auto_update_and_train with caching, keyed by the ETag/Last-Modified of the URL.
+    Falls back to an uncached run when the server gives no version information.
+    fingerprint: url_fingerprint(url) when the caller already has it (saves a HEAD request).
+    copy: as in cached_main_wf.
+    """
+    if fingerprint is None:
+        try:
+            fingerprint = url_fingerprint(url)
+        except Exception as e:
+            print("Could not fingerprint URL, skipping cache:", e)
+    if fingerprint is None:
+        return backend_processing.auto_update_and_train(url, clusters=clusters, scale_features=scale_features,
+                                                        output_geojson=output_geojson, **kwargs)
+
+    def key():
+        model_version = read_current(kwargs["registry_dir"]) if kwargs.get("registry_dir") else None
+        return cache_key(fingerprint, fn="auto_update_and_train", url=url, clusters=clusters,
+                         scale_features=scale_features, model_version=model_version, **kwargs)
+    result = get_cached(key(), cache_dir, copy=copy)
+    if result is not None:
+        # written again from the cached frame: output_geojson may hold another URL's data by now
+        export_geojson(result[0], output_geojson)
+        return result
+    result = backend_processing.auto_update_and_train(url, clusters=clusters, scale_features=scale_features,
+                                                      output_geojson=output_geojson, **kwargs)
+    if result[0] is not None:
+        put_cached(key(), result, cache_dir)
+    return result
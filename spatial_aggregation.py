@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+from backend_processing import RISK_LABELS
+
+"""
+spatial_aggregation.py
+
+Description:
+    Bins detections into regular latitude/longitude grid cells so the map can
+    draw one marker per cell instead of one per detection. Each cell keeps the
+    detection count, max brightness, mean FRP and its dominant risk label.
+    A pyramid of several cell sizes is precomputed by the refresh service and
+    the dashboard picks the finest one that stays under its cell budget.
+"""
+
+GRID_RESOLUTIONS = (0.05, 0.1, 0.25, 0.5, 1.0) # cell size in degrees, finest first
+RISK_CELL_COLORS = np.array([[255, 210, 0, 170], [255, 120, 0, 190], [200, 20, 20, 210]], dtype=np.uint8)
+KM_PER_DEGREE = 111.32
+
+
+def _cell_ids(latitudes, longitudes, resolution):
+    rows = np.floor((np.asarray(latitudes, dtype=float) + 90) / resolution).astype(np.int64)
+    cols = np.floor((np.asarray(longitudes, dtype=float) + 180) / resolution).astype(np.int64)
+    return rows * int(np.ceil(360 / resolution) + 1) + cols, rows, cols
+
+def count_cells(dataframe, resolution):
+    cell_ids, _, _ = _cell_ids(dataframe['latitude'], dataframe['longitude'], resolution)
+    return len(np.unique(cell_ids))
+
+def aggregate_grid(dataframe, resolution=0.25):
+    """
+    Aggregates detections into resolution-degree cells.
+    Returns one row per non-empty cell: latitude/longitude of the cell centre, count,
+    max_brightness, mean_frp and risk_label (most common label in the cell).
+    """
+    cell_ids, rows, cols = _cell_ids(dataframe['latitude'], dataframe['longitude'], resolution)
+    unique_ids, first, cell_index = np.unique(cell_ids, return_index=True, return_inverse=True)
+    n_cells = len(unique_ids)
+
+    grouped = pd.DataFrame({
+        'cell': cell_index,
+        'brightness': dataframe['brightness'].to_numpy(dtype=float),
+        'frp': dataframe['frp'].to_numpy(dtype=float) if 'frp' in dataframe.columns else np.nan,
+    }).groupby('cell')
+    cells = pd.DataFrame({
+        'latitude': (rows[first] + 0.5) * resolution - 90,
+        'longitude': (cols[first] + 0.5) * resolution - 180,
+        'count': np.bincount(cell_index, minlength=n_cells),
+        'max_brightness': grouped['brightness'].max().to_numpy(),
+        'mean_frp': grouped['frp'].mean().round(2).to_numpy(),
+    })
+
+    codes = pd.Categorical(dataframe['risk_label'], categories=RISK_LABELS).codes if 'risk_label' in dataframe.columns \
+        else np.zeros(len(dataframe), dtype=np.int8)
+    codes = np.where(codes < 0, 0, codes)
+    label_counts = np.bincount(cell_index * len(RISK_LABELS) + codes, minlength=n_cells * len(RISK_LABELS))
+    dominant = label_counts.reshape(n_cells, len(RISK_LABELS)).argmax(axis=1)
+    cells['risk_label'] = pd.Categorical.from_codes(dominant, categories=RISK_LABELS, ordered=True)
+    cells.attrs['resolution'] = resolution
+    return cells
+
+def build_grid_pyramid(dataframe, resolutions=GRID_RESOLUTIONS):
+    """
+    Aggregates the same detections at every resolution. Returns one frame with a
+    'resolution' column so the whole pyramid can be stored in a single file.
+    """
+    levels = []
+    for resolution in resolutions:
+        cells = aggregate_grid(dataframe, resolution)
+        cells.insert(0, 'resolution', resolution)
+        levels.append(cells)
+    return pd.concat(levels, ignore_index=True)
+
+def choose_resolution(dataframe, max_cells=20000, resolutions=GRID_RESOLUTIONS):
+    """
+    Finest resolution whose number of non-empty cells fits in max_cells
+    (the coarsest one if none does).
+    """
+    for resolution in sorted(resolutions):
+        if count_cells(dataframe, resolution) <= max_cells:
+            return resolution
+    return max(resolutions)
+
+def pyramid_level(pyramid, max_cells=20000):
+    # finest precomputed level under the cell budget
+    sizes = pyramid.groupby('resolution').size().sort_index()
+    fitting = sizes[sizes <= max_cells]
+    resolution = fitting.index[0] if len(fitting) else sizes.index[-1]
+    cells = pyramid[pyramid['resolution'] == resolution].drop(columns='resolution').reset_index(drop=True)
+    cells.attrs['resolution'] = resolution
+    return cells
+
+def add_cell_colors(cells):
+    # RGBA per cell from its dominant risk, added at draw time so stored pyramids stay numeric
+    codes = pd.Categorical(cells['risk_label'], categories=RISK_LABELS).codes
+    cells['color'] = RISK_CELL_COLORS[np.where(codes < 0, 0, codes)].tolist()
+    return cells
+
+def cell_radius_m(resolution):
+    return resolution * KM_PER_DEGREE * 1000 / 2
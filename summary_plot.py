@@ -0,0 +1,189 @@
+import os
+import json
+import shutil
+import filecmp
+import hashlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.patches import Patch
+
+"""
+summary_plot.py
+
+Description:
+    Renders the brightness vs FRP summary plot for any number of detections.
+    Small inputs are drawn as one scatter call; large ones are binned into a
+    2D count raster per risk label with a single bincount pass and drawn as
+    one image (log-scaled FRP axis, log-scaled counts), so render time and
+    file size stay flat from thousands to millions of points. Rendered PNGs
+    are stored under the hash of what they show (the raster counts, or the
+    raw points for scatter plots) and only redrawn when that changes; the
+    least recently used ones are removed once the cache outgrows
+    MAX_PLOT_CACHE_BYTES.
+"""
+
+PLOT_SUBDIR = "plots" # the plot cache sits inside the result cache directory (see result_cache.py)
+PLOT_CACHE_DIR = os.path.join(".wildfire_cache", PLOT_SUBDIR)
+MAX_PLOT_CACHE_BYTES = 64 * 2**20
+PLOT_VERSION = 1 # bump when the rendering changes, so cached PNGs are redrawn
+DENSITY_THRESHOLD = 20000 # auto mode switches from scatter to density above this many points
+DENSITY_BINS = (240, 160) # brightness x log10(FRP) cells
+LABEL_COLORS = {"Low Risk": "#f2c200", "Medium Risk": "#ff7800", "High Risk": "#c81414"}
+
+
+def _label_codes(labels):
+    # ordered label names and one small code per row
+    categorical = pd.Categorical(labels)
+    return list(categorical.categories), categorical.codes
+
+def _legend_handles(names, colors, codes):
+    present = np.bincount(codes[codes >= 0], minlength=len(names)) > 0
+    return [Patch(color=color, label=name) for name, color, shown in zip(names, colors, present) if shown]
+
+def _label_colors(names):
+    fallback = plt.get_cmap("tab10")
+    return [LABEL_COLORS.get(name, fallback(i % 10)) for i, name in enumerate(names)]
+
+def density_counts(brightness, frp, codes, n_labels, bins=DENSITY_BINS):
+    """
+    Counts of detections per (label, brightness bin, log10 FRP bin), in one vectorized pass.
+    Returns (counts of shape (n_labels, x_bins, y_bins), x_edges, y_edges in log10 FRP).
+    Rows with a missing label or value, or FRP <= 0, are left out.
+    """
+    brightness = np.asarray(brightness, dtype=float)
+    frp = np.asarray(frp, dtype=float)
+    valid = (codes >= 0) & np.isfinite(brightness) & np.isfinite(frp) & (frp > 0)
+    brightness, log_frp, codes = brightness[valid], np.log10(frp[valid]), np.asarray(codes)[valid]
+    x_bins, y_bins = bins
+    if len(brightness) == 0:
+        return np.zeros((n_labels, x_bins, y_bins), dtype=np.int64), np.linspace(0, 1, x_bins + 1), np.linspace(0, 1, y_bins + 1)
+    x_edges = np.linspace(brightness.min(), max(brightness.max(), brightness.min() + 1e-9), x_bins + 1)
+    y_edges = np.linspace(log_frp.min(), max(log_frp.max(), log_frp.min() + 1e-9), y_bins + 1)
+    x = np.clip(((brightness - x_edges[0]) / (x_edges[-1] - x_edges[0]) * x_bins).astype(np.int64), 0, x_bins - 1)
+    y = np.clip(((log_frp - y_edges[0]) / (y_edges[-1] - y_edges[0]) * y_bins).astype(np.int64), 0, y_bins - 1)
+    flat = (codes.astype(np.int64) * x_bins + x) * y_bins + y
+    counts = np.bincount(flat, minlength=n_labels * x_bins * y_bins).reshape(n_labels, x_bins, y_bins)
+    return counts, x_edges, y_edges
+
+def composite_raster(counts, colors):
+    """
+    RGB image (y, x, 3) of the per-label counts: each label is laid over a white
+    background in its color, opacity growing with log(count), higher labels on top.
+    """
+    from matplotlib.colors import to_rgb
+    image = np.ones(counts.shape[2:0:-1] + (3,))
+    scale = np.log1p(counts.max()) or 1.0
+    for layer, color in zip(counts, colors):
+        alpha = (np.log1p(layer.T) / scale)[..., None]
+        alpha = np.where(alpha > 0, 0.25 + 0.75 * alpha, 0.0) # single detections stay visible
+        image = alpha * np.array(to_rgb(color)) + (1 - alpha) * image
+    return image
+
+def _finish_figure(handles, output_path, ylabel):
+    plt.xlabel('Brightness')
+    plt.ylabel(ylabel)
+    plt.title('Wildfire Brightness vs FRP by Risk Level')
+    plt.legend(handles=handles, title="Risk Level")
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+def render_density(counts, x_edges, y_edges, names, output_path):
+    codes = np.flatnonzero(counts.reshape(len(counts), -1).any(axis=1)) # labels with any detection
+    colors = _label_colors(names)
+    plt.figure(figsize=(10, 6))
+    plt.imshow(composite_raster(counts, colors), origin='lower', aspect='auto', interpolation='nearest',
+               extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]))
+    ticks = np.arange(np.floor(y_edges[0]), np.ceil(y_edges[-1]) + 1)
+    ticks = ticks[(ticks >= y_edges[0]) & (ticks <= y_edges[-1])]
+    plt.yticks(ticks, [f"{10 ** tick:g}" for tick in ticks])
+    _finish_figure(_legend_handles(names, colors, codes), output_path, 'Fire Radiative Power (FRP, log scale)')
+
+def render_scatter(brightness, frp, codes, names, output_path):
+    colors = _label_colors(names)
+    valid = codes >= 0
+    palette = np.array([plt.matplotlib.colors.to_rgba(color, 0.6) for color in colors]) if colors else np.zeros((0, 4))
+    plt.figure(figsize=(10, 6))
+    plt.scatter(np.asarray(brightness)[valid], np.asarray(frp)[valid], c=palette[codes[valid]], s=20)
+    _finish_figure(_legend_handles(names, colors, codes), output_path, 'Fire Radiative Power (FRP)')
+
+def content_digest(arrays, **params):
+    # sha256 of the parameters and the raw bytes of every array
+    digest = hashlib.sha256(json.dumps({"version": PLOT_VERSION, **params}, sort_keys=True, default=str).encode())
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype, array.shape)).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def evict_plot_cache(cache_dir=PLOT_CACHE_DIR, max_bytes=MAX_PLOT_CACHE_BYTES, keep=None):
+    # drop the least recently used PNGs (never keep) until the cache fits in max_bytes
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".png"):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        path = os.path.join(cache_dir, name)
+        if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        os.remove(path)
+        total -= size
+
+def clear_plot_cache(cache_dir=PLOT_CACHE_DIR):
+    evict_plot_cache(cache_dir, max_bytes=0)
+
+def render_summary_plot(brightness, frp, labels, output_path="wildfire_summary_plot.png", mode="auto",
+                        bins=DENSITY_BINS, density_threshold=DENSITY_THRESHOLD, cache_dir=PLOT_CACHE_DIR,
+                        max_cache_bytes=MAX_PLOT_CACHE_BYTES):
+    """
+    Writes the summary plot of the detections to output_path.
+    mode: 'scatter', 'density' or 'auto' (density above density_threshold points).
+    The PNG is rendered once per distinct content into cache_dir and copied from there;
+    cache_dir=None always renders. Returns (output_path, digest).
+    """
+    names, codes = _label_codes(labels)
+    if mode == "auto":
+        mode = "density" if len(codes) > density_threshold else "scatter"
+    if mode == "density":
+        counts, x_edges, y_edges = density_counts(brightness, frp, codes, len(names), bins)
+        # the image depends only on the binned counts, so that is what gets hashed
+        digest = content_digest([counts, x_edges, y_edges], mode=mode, labels=names)
+        render = lambda path: render_density(counts, x_edges, y_edges, names, path)
+    elif mode == "scatter":
+        brightness, frp = np.asarray(brightness, dtype=float), np.asarray(frp, dtype=float)
+        digest = content_digest([brightness, frp, codes], mode=mode, labels=names)
+        render = lambda path: render_scatter(brightness, frp, codes, names, path)
+    else:
+        raise ValueError(f"Unknown plot mode: {mode}")
+
+    if not cache_dir:
+        render(output_path)
+        return output_path, digest
+    os.makedirs(cache_dir, exist_ok=True)
+    cached_path = os.path.join(cache_dir, digest + ".png")
+    if not os.path.exists(cached_path):
+        handle, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".png")
+        os.close(handle)
+        try:
+            render(temp_path)
+            os.replace(temp_path, cached_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        evict_plot_cache(cache_dir, max_cache_bytes, keep=cached_path)
+    else:
+        os.utime(cached_path) # mark as recently used for eviction
+    if os.path.abspath(cached_path) != os.path.abspath(output_path) and not (
+            os.path.exists(output_path) and filecmp.cmp(cached_path, output_path, shallow=False)):
+        shutil.copyfile(cached_path, output_path)
+    return output_path, digest
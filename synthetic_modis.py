@@ -0,0 +1,116 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+"""
+synthetic_modis.py
+
+Description:
+    Seeded generator for MODIS C6.1 style active fire CSVs at any size, used
+    to test and benchmark the pipeline well beyond the 1,049 row sample.
+    Detections are drawn around hotspots (fire complexes of different sizes)
+    inside the contiguous US and Hawaii, with skewed brightness/FRP, a
+    day/night mix and the same columns and formats as the FIRMS exports.
+"""
+
+MODIS_COLUMNS = ['latitude', 'longitude', 'brightness', 'scan', 'track', 'acq_date', 'acq_time',
+                 'satellite', 'confidence', 'version', 'bright_t31', 'frp', 'daynight']
+
+# (lat_min, lat_max, lon_min, lon_max, share of hotspots)
+REGIONS = [
+    (25.0, 49.0, -124.5, -67.0, 0.97), # contiguous US
+    (18.9, 22.2, -160.3, -154.8, 0.03), # Hawaii
+]
+
+
+def _hotspots(rng, n_hotspots):
+    shares = np.array([region[4] for region in REGIONS])
+    region_ids = rng.choice(len(REGIONS), size=n_hotspots, p=shares / shares.sum())
+    bounds = np.array([region[:4] for region in REGIONS])[region_ids]
+    latitudes = rng.uniform(bounds[:, 0], bounds[:, 1])
+    longitudes = rng.uniform(bounds[:, 2], bounds[:, 3])
+    # a few large complexes and many small fires: spread in degrees and popularity are heavy tailed
+    spreads = rng.lognormal(mean=np.log(0.05), sigma=0.8, size=n_hotspots).clip(0.005, 1.5)
+    weights = rng.pareto(1.5, size=n_hotspots) + 0.1
+    intensity = rng.gamma(2.0, 1.0, size=n_hotspots)
+    return latitudes, longitudes, spreads, weights / weights.sum(), intensity
+
+def generate_modis(n_rows, seed=0, n_hotspots=None, n_days=1, start_date="2025-03-25", hotspots=None):
+    """
+    Returns a DataFrame of n_rows synthetic detections with the MODIS CSV columns.
+    The same seed always produces the same rows. n_hotspots defaults to about one
+    hotspot per 200 detections (at least 5), n_days spreads acq_date over that many days.
+    hotspots: output of _hotspots to reuse, so chunks of one file share the same fires.
+    """
+    rng = np.random.default_rng(seed)
+    if hotspots is None:
+        hotspots = _hotspots(rng, n_hotspots or max(5, n_rows // 200))
+    hot_lat, hot_lon, spreads, weights, hot_intensity = hotspots
+    hotspot = rng.choice(len(hot_lat), size=n_rows, p=weights)
+
+    latitude = hot_lat[hotspot] + rng.normal(0, spreads[hotspot])
+    longitude = hot_lon[hotspot] + rng.normal(0, spreads[hotspot]) / np.cos(np.radians(hot_lat[hotspot]))
+    is_day = rng.random(n_rows) < 0.6
+    # hotter during the day, long right tail; hotspot intensity shifts whole complexes
+    intensity = hot_intensity[hotspot]
+    brightness = np.where(is_day, 305, 295) + rng.gamma(1.5, 6 + 4 * intensity)
+    brightness = brightness.clip(290, 505)
+    frp = np.exp(0.045 * (brightness - 300) + rng.normal(1.5, 0.9, n_rows)).clip(0.5, 5000)
+    scan = rng.uniform(1.0, 4.8, n_rows)
+    track = (scan * rng.uniform(0.45, 1.0, n_rows)).clip(1.0, 2.0)
+
+    days = rng.integers(0, n_days, n_rows)
+    hours = np.where(is_day, rng.integers(15, 22, n_rows), rng.integers(2, 10, n_rows))
+    acq_time = hours * 100 + rng.integers(0, 60, n_rows)
+    acq_date = (pd.Timestamp(start_date) + pd.to_timedelta(days, unit="D")).strftime("%Y-%m-%d")
+
+    confidence = (40 + (brightness - 300) * 1.2 + rng.normal(0, 12, n_rows)).clip(0, 100).astype(int)
+    dataframe = pd.DataFrame({
+        'latitude': latitude.round(5),
+        'longitude': longitude.round(5),
+        'brightness': brightness.round(2),
+        'scan': scan.round(2),
+        'track': track.round(2),
+        'acq_date': acq_date,
+        'acq_time': acq_time,
+        'satellite': np.where(rng.random(n_rows) < 0.5, 'T', 'A'),
+        'confidence': confidence,
+        'version': '6.1NRT',
+        'bright_t31': (brightness - rng.gamma(2.0, 6.0, n_rows)).clip(265, 330).round(2),
+        'frp': frp.round(2),
+        'daynight': np.where(is_day, 'D', 'N'),
+    })
+    return dataframe[MODIS_COLUMNS]
+
+def write_modis_csv(path, n_rows, seed=0, chunk_rows=1_000_000, n_hotspots=None, **kwargs):
+    """
+    Writes n_rows synthetic detections to path in chunks, so 10M row files are generated
+    with bounded memory. acq_time is zero padded to HHMM like the FIRMS exports.
+    Chunks use derived seeds, so the output only depends on (n_rows, seed, chunk_rows).
+    """
+    hotspots = _hotspots(np.random.default_rng([seed, 0xF1]), n_hotspots or max(5, n_rows // 200))
+    written = 0
+    with open(path, "w", newline="") as handle:
+        for index, start in enumerate(range(0, max(n_rows, 1), chunk_rows)):
+            rows = min(chunk_rows, n_rows - start)
+            if rows <= 0:
+                break
+            chunk = generate_modis(rows, seed=[seed, index], hotspots=hotspots, **kwargs)
+            chunk['acq_time'] = chunk['acq_time'].map("{:04d}".format)
+            chunk.to_csv(handle, index=False, header=index == 0)
+            written += rows
+    if written == 0:
+        pd.DataFrame(columns=MODIS_COLUMNS).to_csv(path, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic MODIS active fire CSV.")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=1)
+    args = parser.parse_args()
+    write_modis_csv(args.path, args.rows, seed=args.seed, n_days=args.days)
+    print(f"Wrote {args.rows} synthetic detections to {args.path}")
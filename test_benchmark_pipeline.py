@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from benchmark_pipeline import compare_to_baseline, load_baseline, run_benchmarks, save_baseline
+
+
+class TestBenchmarkPipeline(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_every_stage_measured_in_both_modes(self):
+        results = run_benchmarks(sizes=[300], seed=1, clusters=3, data_dir=self.temp_dir)
+        self.assertEqual(set(results['mode']), {"file", "url"})
+        url_stages = set(results.loc[results['mode'] == "url", 'stage'])
+        self.assertIn("ingest_url", url_stages)
+        self.assertIn("run_model", url_stages)
+        self.assertIn("export_geojson", url_stages)
+        self.assertTrue((results['seconds'] >= 0).all())
+        self.assertTrue((results['peak_mb'] >= 0).all())
+
+        path = os.path.join(self.temp_dir, "baseline.json")
+        save_baseline(results, path)
+        pd.testing.assert_frame_equal(load_baseline(path), results, check_dtype=False)
+
+    def test_regressions_are_flagged(self):
+        baseline = pd.DataFrame([
+            {"rows": 1000, "mode": "file", "stage": "run_model", "seconds": 1.0, "peak_mb": 50.0},
+            {"rows": 1000, "mode": "file", "stage": "preprocess", "seconds": 0.01, "peak_mb": 0.5},
+        ])
+        current = baseline.copy()
+        current.loc[0, "seconds"] = 2.0 # 100% slower
+        current.loc[1, "seconds"] = 0.03 # 200% slower but under the absolute floor
+        regressions = compare_to_baseline(current, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions.iloc[0]["stage"], "run_model")
+        self.assertEqual(regressions.iloc[0]["metric"], "seconds")
+        self.assertTrue(compare_to_baseline(baseline, baseline).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
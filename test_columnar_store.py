@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from backend_processing import load_data
+from columnar_store import convert_csv_to_columnar, ensure_columnar, load_columnar
+
+
+class TestColumnarStore(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.workdir, "fires.csv")
+        with open(self.csv_path, "w") as handle:
+            handle.write(
+                "latitude,longitude,brightness,scan,track,acq_date,acq_time,satellite,confidence,version,bright_t31,frp,daynight\n"
+                "20.04031,-77.49902,301.84,1.01,1.01,2025-03-25,0228,T,45,6.1NRT,291.75,3.93,N\n"
+                "34.5,-118.25,410.5,1.2,1.1,2025-03-26,2359,A,90,6.1NRT,300.1,55.2,D\n"
+            )
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_schema_and_timestamp(self):
+        store = convert_csv_to_columnar(self.csv_path)
+        df = load_columnar(store)
+        self.assertEqual(df['latitude'].dtype, 'float32')
+        self.assertEqual(df['confidence'].dtype, 'uint8')
+        self.assertEqual(df['satellite'].dtype, 'category')
+        self.assertEqual(df['acq_time'].tolist(), [228, 2359])
+        self.assertEqual(df['acq_datetime'].tolist(), [
+            pd.Timestamp("2025-03-25 02:28", tz="UTC"), pd.Timestamp("2025-03-26 23:59", tz="UTC")])
+
+    def test_projection_and_chunks_through_load_data(self):
+        store = ensure_columnar(self.csv_path)
+        df = load_data(store, columns=['latitude', 'brightness'])
+        self.assertEqual(list(df.columns), ['latitude', 'brightness'])
+        chunks = list(load_data(store, chunksize=1))
+        self.assertEqual(len(chunks), 2)
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), load_data(store))
+
+    def test_ensure_columnar_reuses_store(self):
+        store = ensure_columnar(self.csv_path)
+        mtime = os.path.getmtime(store)
+        self.assertEqual(ensure_columnar(self.csv_path), store)
+        self.assertEqual(os.path.getmtime(store), mtime)
+
+
+if __name__ == '__main__':
+    unittest.main()
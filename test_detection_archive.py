@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import detection_archive
+from backend_processing import get_cluster_summary
+from detection_archive import (append_detections, list_archive_days, load_daily_summaries, query_detections,
+                               rolling_trends)
+from synthetic_modis import generate_modis
+
+
+class TestDetectionArchive(unittest.TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.detections = generate_modis(3000, seed=2, n_days=5, start_date="2025-03-01")
+        self.detections['cluster_mapping'] = (self.detections['longitude'] > -95).astype(int)
+
+    def tearDown(self):
+        shutil.rmtree(self.archive_dir)
+
+    def test_partitions_by_day(self):
+        written = append_detections(self.detections, self.archive_dir)
+        expected = sorted(self.detections['acq_date'].unique())
+        self.assertEqual(written, expected)
+        self.assertEqual(list_archive_days(self.archive_dir), expected)
+        self.assertEqual(len(query_detections(archive_dir=self.archive_dir)), len(self.detections))
+
+    def test_new_day_only_writes_its_partition(self):
+        append_detections(self.detections, self.archive_dir)
+        next_day = generate_modis(200, seed=3, start_date="2025-03-06")
+        with mock.patch("detection_archive._write_parquet", wraps=detection_archive._write_parquet) as write:
+            self.assertEqual(append_detections(next_day, self.archive_dir), ["2025-03-06"])
+        written_paths = [call.args[1] for call in write.call_args_list]
+        self.assertTrue(all("acq_date=2025-03-06" in path for path in written_paths))
+        self.assertEqual(len(written_paths), 2) # detections + summary
+
+    def test_overlapping_snapshot_is_deduplicated(self):
+        append_detections(self.detections, self.archive_dir)
+        day = self.detections[self.detections['acq_date'] == "2025-03-02"]
+        append_detections(day, self.archive_dir)
+        archived = query_detections("2025-03-02", "2025-03-03", archive_dir=self.archive_dir)
+        self.assertEqual(len(archived), len(day))
+
+    def test_time_range_and_bbox_query(self):
+        append_detections(self.detections, self.archive_dir)
+        bbox = (-110, 30, -90, 42)
+        start, end = "2025-03-02 12:00", "2025-03-04"
+        with mock.patch("pyarrow.parquet.read_table", wraps=__import__("pyarrow.parquet").parquet.read_table) as read:
+            result = query_detections(start, end, bbox=bbox, columns=['latitude', 'longitude', 'brightness'],
+                                      archive_dir=self.archive_dir)
+        self.assertEqual(read.call_count, 2) # only the 2nd and 3rd of March are opened
+
+        stamps = pd.to_datetime(self.detections['acq_date'] + " " + self.detections['acq_time'].map("{:04d}".format),
+                                format="%Y-%m-%d %H%M", utc=True)
+        expected = self.detections[(stamps >= pd.Timestamp(start, tz="UTC")) & (stamps < pd.Timestamp(end, tz="UTC"))
+                                   & self.detections['longitude'].astype('float32').between(-110, -90)
+                                   & self.detections['latitude'].astype('float32').between(30, 42)]
+        self.assertEqual(len(result), len(expected))
+        self.assertEqual(list(result.columns), ['acq_date', 'latitude', 'longitude', 'brightness'])
+        self.assertTrue(query_detections("2026-01-01", archive_dir=self.archive_dir).empty)
+
+    def test_daily_summaries_match_cluster_summary(self):
+        append_detections(self.detections, self.archive_dir)
+        summaries = load_daily_summaries("2025-03-03", "2025-03-04", archive_dir=self.archive_dir)
+        day = self.detections[self.detections['acq_date'] == "2025-03-03"].copy()
+        expected = get_cluster_summary(day.astype({'brightness': 'float32', 'frp': 'float32'}))
+        pd.testing.assert_frame_equal(summaries[expected.columns].reset_index(drop=True), expected,
+                                      check_dtype=False, atol=0.01)
+        self.assertEqual(summaries['detections'].sum(), len(day))
+
+    def test_rolling_trends_fill_missing_days(self):
+        summaries = pd.DataFrame({
+            'acq_date': ["2025-03-01", "2025-03-01", "2025-03-03"],
+            'cluster_mapping': [0, 1, 0],
+            'avg_brightness': [300.0, 400.0, 350.0],
+            'avg_frp': [10.0, 30.0, 20.0],
+            'avg_risk': [200.0, 250.0, 220.0],
+            'detections': [1, 3, 2],
+        })
+        trends = rolling_trends(summaries, window_days=2)
+        self.assertEqual(len(trends), 3)
+        self.assertEqual(trends['detections'].tolist(), [4, 0, 2])
+        self.assertAlmostEqual(trends['avg_brightness'].iloc[0], 375.0)
+        self.assertTrue(pd.isna(trends['avg_brightness'].iloc[1]))
+        self.assertEqual(trends['detections_rolling'].tolist(), [4.0, 2.0, 1.0])
+        self.assertTrue(rolling_trends(summaries.iloc[:0]).empty)
+
+    def test_requires_acq_date(self):
+        with self.assertRaises(ValueError):
+            append_detections(pd.DataFrame({'latitude': [1.0], 'longitude': [2.0]}), self.archive_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+import backend_processing
+from backend_processing import auto_update_and_train
+from feed_sync import poll_feed, commit_poll, detection_hashes
+
+HEADER = "latitude,longitude,brightness,acq_date,acq_time,satellite,frp\n"
+
+
+def _rows(start, stop):
+    return "".join(f"{30 + i * 0.5},{-100 - i * 0.5},{300 + i},2025-03-25,{100 + i},T,{i}\n" for i in range(start, stop))
+
+
+class _ConditionalHandler(BaseHTTPRequestHandler):
+    body = HEADER + _rows(0, 10)
+    etag = '"v1"'
+    full_responses = 0
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == _ConditionalHandler.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        _ConditionalHandler.full_responses += 1
+        body = _ConditionalHandler.body.encode()
+        self.send_response(200)
+        self.send_header("ETag", _ConditionalHandler.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFeedSync(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), _ConditionalHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/24h.csv"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        _ConditionalHandler.body = HEADER + _rows(0, 10)
+        _ConditionalHandler.etag = '"v1"'
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    def test_hashes_ignore_dtype_differences(self):
+        a = pd.DataFrame({'latitude': [30.5], 'longitude': [-100.5], 'acq_date': ['2025-03-25'],
+                          'acq_time': [228], 'satellite': ['T']})
+        b = a.astype({'latitude': 'float32', 'longitude': 'float32', 'acq_time': 'int16', 'satellite': 'category'})
+        self.assertEqual(detection_hashes(a)[0], detection_hashes(b)[0])
+
+    def test_conditional_request_and_delta(self):
+        new_rows, pending = poll_feed(self.url, self.state_dir)
+        self.assertEqual(len(new_rows), 10)
+        commit_poll(self.state_dir, pending)
+
+        # unchanged: answered with a 304, nothing parsed
+        self.assertEqual(poll_feed(self.url, self.state_dir), (None, None))
+
+        # overlapping pull with three new rows and a duplicate line
+        _ConditionalHandler.body = HEADER + _rows(5, 13) + _rows(12, 13)
+        _ConditionalHandler.etag = '"v2"'
+        new_rows, pending = poll_feed(self.url, self.state_dir, chunksize=4)
+        self.assertEqual(new_rows['acq_time'].tolist(), [110, 111, 112])
+
+    def test_uncommitted_rows_are_offered_again(self):
+        poll_feed(self.url, self.state_dir)
+        new_rows, _ = poll_feed(self.url, self.state_dir)
+        self.assertEqual(len(new_rows), 10)
+
+    def test_local_file_feed(self):
+        path = Path(self.state_dir) / "feed.csv"
+        path.write_text(HEADER + _rows(0, 4))
+        new_rows, pending = poll_feed(path.as_uri(), self.state_dir)
+        commit_poll(self.state_dir, pending)
+        self.assertEqual(poll_feed(path.as_uri(), self.state_dir), (None, None))
+
+    def test_auto_update_and_train_skips_unchanged_feed(self):
+        output = os.path.join(self.state_dir, "out.json")
+        geo_df, model, score, stats = auto_update_and_train(self.url, clusters=2, output_geojson=output,
+                                                            state_dir=self.state_dir)
+        self.assertEqual(len(geo_df), 10)
+        fetches = _ConditionalHandler.full_responses
+        result = auto_update_and_train(self.url, clusters=2, output_geojson=output, state_dir=self.state_dir)
+        self.assertEqual(result, (None, None, None, None))
+        self.assertEqual(_ConditionalHandler.full_responses, fetches)
+
+    def test_auto_update_and_train_with_automatic_k(self):
+        output = os.path.join(self.state_dir, "out.json")
+        run_model = backend_processing.run_model
+        # the sweep itself is covered elsewhere; a fixed k keeps this fast on 10 rows
+        with mock.patch("backend_processing.run_model", side_effect=lambda df, **kwargs: run_model(df, clusters=2)) as sweep:
+            geo_df, model, score, stats = auto_update_and_train(self.url, clusters="auto", output_geojson=output,
+                                                                state_dir=self.state_dir)
+        self.assertEqual(sweep.call_args.kwargs["clusters"], "auto")
+        self.assertEqual(len(geo_df), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import filter_index
+from filter_index import (brightness_bounds, brightness_histogram, build_filter_index, filter_frame, filter_slices,
+                          label_rows, lookup_prepared, prepared_frame, present_labels)
+
+
+class TestFilterIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        n = 2000
+        self.df = pd.DataFrame({
+            'latitude': rng.uniform(25, 49, n),
+            'brightness': rng.uniform(290, 500, n).round(1),
+            'risk_label': rng.choice(["Low Risk", "Medium Risk", "High Risk"], n, p=[0.2, 0.5, 0.3]),
+        })
+        self.sorted_df, self.index = build_filter_index(self.df)
+
+    def expected(self, labels, low, high):
+        mask = self.df['risk_label'].isin(labels) & self.df['brightness'].between(low, high)
+        return self.df[mask]
+
+    def assert_same_rows(self, result, expected):
+        key = ['latitude', 'brightness', 'risk_label']
+        pd.testing.assert_frame_equal(result[key].astype({'risk_label': str}).sort_values(key).reset_index(drop=True),
+                                      expected[key].astype({'risk_label': str}).sort_values(key).reset_index(drop=True))
+
+    def test_layout(self):
+        self.assertEqual(len(self.sorted_df), len(self.df))
+        for label in self.index['labels']:
+            rows = label_rows(self.index, label)
+            block = self.sorted_df.iloc[rows.start:rows.stop]
+            self.assertTrue((block['risk_label'] == label).all())
+            self.assertTrue(block['brightness'].is_monotonic_increasing)
+            self.assertEqual(len(rows), (self.df['risk_label'] == label).sum())
+
+    def test_filters_match_boolean_masks(self):
+        cases = [
+            (["Low Risk", "Medium Risk", "High Risk"], 290, 500),
+            (["High Risk"], 350.5, 420),
+            (["Low Risk", "High Risk"], 300, 450),
+            (["Medium Risk"], 600, 700),
+            ([], 290, 500),
+        ]
+        for labels, low, high in cases:
+            self.assert_same_rows(filter_frame(self.sorted_df, self.index, labels, low, high), self.expected(labels, low, high))
+
+    def test_bounds_are_inclusive(self):
+        value = float(self.df['brightness'].iloc[0])
+        label = self.df['risk_label'].iloc[0]
+        result = filter_frame(self.sorted_df, self.index, [label], value, value)
+        self.assertGreaterEqual(len(result), 1)
+        self.assertTrue((result['brightness'] == value).all())
+
+    def test_whole_label_ranges_are_slices(self):
+        slices = filter_slices(self.index, ["Low Risk", "Medium Risk"])
+        self.assertEqual(len(slices), 2)
+        result = filter_frame(self.sorted_df, self.index, ["Low Risk", "Medium Risk"])
+        # adjacent whole labels are served as one slice of the base frame
+        self.assertTrue(np.shares_memory(result['brightness'].to_numpy(), self.sorted_df['brightness'].to_numpy()))
+
+    def test_bounds_and_present_labels(self):
+        self.assertEqual(brightness_bounds(self.index), (self.df['brightness'].min(), self.df['brightness'].max()))
+        high = self.df[self.df['risk_label'] == "High Risk"]['brightness']
+        self.assertEqual(brightness_bounds(self.index, ["High Risk"]), (high.min(), high.max()))
+        only_low = build_filter_index(self.df[self.df['risk_label'] == "Low Risk"])[1]
+        self.assertEqual(present_labels(only_low), ["Low Risk"])
+        self.assertIsNone(brightness_bounds(only_low, ["High Risk"]))
+
+    def test_histogram_matches_numpy(self):
+        labels, low, high = ["Low Risk", "High Risk"], 320.0, 470.0
+        counts = brightness_histogram(self.index, labels, low, high, nbins=30)
+        self.assertEqual(set(counts['risk_label']), set(labels))
+        for label in labels:
+            values = self.expected([label], low, high)['brightness']
+            expected, edges = np.histogram(values, bins=30, range=(low, high))
+            rows = counts[counts['risk_label'] == label]
+            np.testing.assert_array_equal(rows['count'].to_numpy(), expected)
+            np.testing.assert_allclose(rows['bin_start'].to_numpy(), edges[:-1])
+        self.assertTrue(brightness_histogram(self.index, [], low, high).empty)
+
+    def test_unknown_labels_are_dropped(self):
+        df = self.df.copy()
+        df.loc[0, 'risk_label'] = "Unknown"
+        sorted_df, _ = build_filter_index(df)
+        self.assertEqual(len(sorted_df), len(df) - 1)
+
+    def test_prepared_frame_is_memoised(self):
+        calls = []
+
+        def prepare(df):
+            calls.append(1)
+            return df.copy()
+
+        filter_index._prepared.clear()
+        first = prepared_frame(("test", 1), self.df, prepare)
+        second = prepared_frame(("test", 1), self.df, prepare)
+        self.assertIs(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertIs(lookup_prepared(("test", 1)), first)
+        self.assertIsNone(lookup_prepared(("test", 2)))
+        self.assertIsNone(lookup_prepared(None))
+        prepared_frame(None, self.df, prepare)
+        prepared_frame(None, self.df, prepare)
+        self.assertEqual(len(calls), 3)
+        filter_index._prepared.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
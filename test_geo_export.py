@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from geo_export import export_geojson, export_geoparquet, read_geoparquet
+
+
+class TestGeoExport(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.data = pd.DataFrame({
+            'latitude': [34.123456789, 36.5, 35.25],
+            'longitude': [-119.987654321, -121.0, -120.75],
+            'brightness': [300.5, 450.0, np.nan],
+            'risk_label': pd.Categorical(["Medium Risk", "High Risk", "Low Risk"]),
+            'color': [[1, 2, 3, 160], [4, 5, 6, 160], [7, 8, 9, 160]],
+            'acq_datetime': pd.to_datetime(["2025-03-25 02:28"] * 3, utc=True),
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_geojson_features(self):
+        path = os.path.join(self.workdir, "out.json")
+        stats = export_geojson(self.data, path, chunksize=2)
+        self.assertEqual(stats["rows"], 3)
+        self.assertEqual(stats["bytes"], os.path.getsize(path))
+        with open(path) as handle:
+            collection = json.load(handle)
+        features = collection["features"]
+        self.assertEqual(len(features), 3)
+        self.assertEqual(features[0]["geometry"]["coordinates"], [-119.987654321, 34.123456789])
+        self.assertEqual(features[1]["properties"]["risk_label"], "High Risk")
+        self.assertIsNone(features[2]["properties"]["brightness"])
+        self.assertEqual(features[0]["properties"]["color"], [1, 2, 3, 160])
+        # readable by the regular GIS stack as well
+        self.assertEqual(len(gpd.read_file(path)), 3)
+
+    def test_geoparquet_round_trip(self):
+        path = os.path.join(self.workdir, "out.parquet")
+        export_geoparquet(self.data, path)
+        geo_df = read_geoparquet(path, geometry=True)
+        np.testing.assert_allclose(geo_df.geometry.x, self.data['longitude'])
+        np.testing.assert_allclose(geo_df.geometry.y, self.data['latitude'])
+        self.assertTrue(geo_df.crs.equals("OGC:CRS84"))  # GeoParquet default when no crs is written
+
+        plain = read_geoparquet(path)
+        self.assertNotIn('geometry', plain.columns)
+        self.assertEqual(list(plain['risk_label']), list(self.data['risk_label']))
+
+    def test_empty_frame(self):
+        path = os.path.join(self.workdir, "empty.json")
+        export_geojson(self.data.iloc[:0], path)
+        with open(path) as handle:
+            self.assertEqual(json.load(handle)["features"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import backend_processing
+import model_registry
+from backend_processing import preprocess, run_model_registered
+from model_registry import list_versions, load_model, population_stability, distance_edges
+from columnar_store import ensure_columnar
+from synthetic_modis import _hotspots, generate_modis
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry_dir = tempfile.mkdtemp()
+        hotspots = _hotspots(np.random.default_rng(7), 60)
+        self.first = preprocess(generate_modis(3000, seed=1, hotspots=hotspots))
+        self.second = preprocess(generate_modis(3000, seed=2, hotspots=hotspots)) # same fires, new detections
+        self.shifted = preprocess(generate_modis(3000, seed=3)) # different fires
+
+    def tearDown(self):
+        model_registry._loaded_models.clear()
+        shutil.rmtree(self.registry_dir)
+
+    def test_first_run_saves_model_with_metadata(self):
+        df, model, score = run_model_registered(self.first, clusters=5, registry_dir=self.registry_dir)
+        saved, metadata = load_model(self.registry_dir)
+        self.assertTrue(df.attrs['model']['refit'])
+        self.assertEqual(metadata['version'], df.attrs['model']['version'])
+        self.assertEqual(metadata['k'], 5)
+        self.assertEqual(metadata['rows'], len(self.first))
+        self.assertEqual(metadata['training_window'], {"start": "2025-03-25", "end": "2025-03-25"})
+        self.assertAlmostEqual(metadata['silhouette'], score)
+        self.assertEqual(len(metadata['distance_edges']), model_registry.DISTANCE_BINS - 1)
+        np.testing.assert_allclose(saved.cluster_centers_, model.cluster_centers_)
+        self.assertIsNotNone(saved.scaler_)
+
+    def test_similar_data_is_only_predicted(self):
+        _, model, _ = run_model_registered(self.first, clusters=5, registry_dir=self.registry_dir)
+        model_registry._loaded_models.clear() # as after a restart: loaded from disk
+        with mock.patch("backend_processing.run_model") as run_model:
+            df, reused, _ = run_model_registered(self.second, clusters=5, registry_dir=self.registry_dir)
+        run_model.assert_not_called()
+        self.assertFalse(df.attrs['model']['refit'])
+        self.assertLess(df.attrs['model']['drift'], model_registry.DRIFT_THRESHOLD)
+        expected = model.predict(model.scaler_.transform(self.second[['latitude', 'longitude']].values))
+        np.testing.assert_array_equal(df['cluster_mapping'].to_numpy(), expected)
+        self.assertEqual(len(list_versions(self.registry_dir)), 1)
+
+    def test_drift_triggers_refit_with_stable_ids(self):
+        _, model, _ = run_model_registered(self.first, clusters=5, registry_dir=self.registry_dir)
+        df, refit_model, _ = run_model_registered(self.shifted, clusters=5, registry_dir=self.registry_dir)
+        self.assertTrue(df.attrs['model']['refit'])
+        _, metadata = load_model(self.registry_dir)
+        self.assertEqual(metadata['reason'], "drift")
+        self.assertEqual(len(list_versions(self.registry_dir)), 2)
+        # labels agree with the renumbered centroids
+        expected = refit_model.predict(refit_model.scaler_.transform(df[['latitude', 'longitude']].values))
+        np.testing.assert_array_equal(df['cluster_mapping'].to_numpy(), expected)
+
+    def test_refit_keeps_cluster_ids(self):
+        _, model, _ = run_model_registered(self.first, clusters=5, registry_dir=self.registry_dir)
+        old_labels = model.predict(model.scaler_.transform(self.first[['latitude', 'longitude']].values))
+        df, _, _ = run_model_registered(self.first.copy(), clusters=5, registry_dir=self.registry_dir, refit=True)
+        # same data: after renumbering nearly every detection keeps its cluster id
+        self.assertGreater((df['cluster_mapping'].to_numpy() == old_labels).mean(), 0.95)
+
+    def test_changed_k_refits(self):
+        run_model_registered(self.first, clusters=5, registry_dir=self.registry_dir)
+        df, model, _ = run_model_registered(self.second, clusters=6, registry_dir=self.registry_dir)
+        self.assertEqual(model.n_clusters, 6)
+        self.assertEqual(load_model(self.registry_dir)[1]['reason'], "parameters changed")
+
+    def test_smaller_k_keeps_ids_predictable(self):
+        run_model_registered(self.first, clusters=8, registry_dir=self.registry_dir)
+        df, model, _ = run_model_registered(self.second, clusters=5, registry_dir=self.registry_dir)
+        self.assertEqual(set(df['cluster_mapping']), set(range(5)))
+        scaled = model.scaler_.transform(df[['latitude', 'longitude']].values)
+        np.testing.assert_array_equal(model.predict(scaled), df['cluster_mapping'].to_numpy())
+
+    def test_population_stability(self):
+        rng = np.random.default_rng(0)
+        reference = rng.gamma(2.0, 1.0, 5000)
+        edges = distance_edges(reference)
+        self.assertLess(population_stability(edges, rng.gamma(2.0, 1.0, 5000)), 0.05)
+        self.assertGreater(population_stability(edges, rng.gamma(2.0, 2.0, 5000)), 0.2)
+        self.assertEqual(population_stability(edges, np.array([])), 0.0)
+
+    def test_main_wf_uses_registry(self):
+        path = os.path.join(self.registry_dir, "fires.csv")
+        generate_modis(500, seed=4).to_csv(path, index=False)
+        plot_path = os.path.join(self.registry_dir, "plot.png")
+        plot_cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, plot_cache_dir)
+        backend_processing.main_wf(path, clusters=4, plot_path=plot_path, registry_dir=self.registry_dir,
+                                   plot_cache_dir=plot_cache_dir)
+        df, _, _, _ = backend_processing.main_wf(path, clusters=4, plot_path=plot_path, registry_dir=self.registry_dir,
+                                                 plot_cache_dir=plot_cache_dir)
+        self.assertFalse(df.attrs['model']['refit'])
+
+    def test_predicts_across_float_widths(self):
+        # the dashboard trains on the float32 columnar store, the refresh service reads the float64 CSV
+        csv_path = os.path.join(self.registry_dir, "fires.csv")
+        generate_modis(500, seed=4).to_csv(csv_path, index=False)
+        store_path = ensure_columnar(csv_path)
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir)
+        for first, second in ((store_path, csv_path), (csv_path, store_path)):
+            registry_dir = tempfile.mkdtemp(dir=work_dir)
+            for path in (first, second):
+                df, _, _, _ = backend_processing.main_wf(path, clusters=4, registry_dir=registry_dir,
+                                                         plot_path=os.path.join(work_dir, "plot.png"),
+                                                         plot_cache_dir=work_dir, as_geodataframe=False)
+            self.assertFalse(df.attrs['model']['refit'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import pandas as pd
+
+import pipeline_profiler
+from backend_processing import preprocess, run_model
+from pipeline_profiler import enable_profiling, get_records, clear_records, profile_stage, stage, timings_frame
+
+
+class TestPipelineProfiler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.temp_dir, "timings.jsonl")
+        clear_records()
+
+    def tearDown(self):
+        enable_profiling(False)
+        clear_records()
+        shutil.rmtree(self.temp_dir)
+
+    def test_disabled_records_nothing(self):
+        enable_profiling(False)
+        preprocess(pd.DataFrame({'latitude': [1.0, 0.0], 'longitude': [0.0, 1.0]}))
+        with stage("block") as record:
+            self.assertIsNone(record)
+        self.assertEqual(get_records(), [])
+
+    def test_stage_records_rows_and_nesting(self):
+        enable_profiling(log_path=self.log_path)
+        df = pd.DataFrame({
+            'latitude': [34.0, 34.1, 40.0, 40.1, 45.0, 45.1],
+            'longitude': [-118.0, -118.1, -120.0, -120.1, -100.0, -100.1],
+            'brightness': [300, 310, 320, 330, 340, 350],
+            'frp': [10, 20, 30, 40, 50, 60],
+        })
+        run_model(preprocess(df), clusters=3)
+
+        records = {record["stage"]: record for record in get_records()}
+        self.assertEqual(records["preprocess"]["rows_in"], 6)
+        self.assertEqual(records["preprocess"]["rows_out"], 6)
+        self.assertEqual(records["kmeans_fit"]["parent"], "run_model")
+        self.assertEqual(records["score_clustering"]["parent"], "run_model")
+        self.assertIsNone(records["run_model"]["parent"])
+        for record in records.values():
+            self.assertGreaterEqual(record["wall_s"], 0)
+            self.assertIn("cpu_s", record)
+            self.assertIn("mem_delta_mb", record)
+
+        with open(self.log_path) as handle:
+            lines = [json.loads(line) for line in handle]
+        self.assertEqual([line["stage"] for line in lines], [record["stage"] for record in get_records()])
+
+    def test_failed_stage_is_recorded_and_reraised(self):
+        enable_profiling(log_path=self.log_path)
+
+        @profile_stage("broken")
+        def broken(dataframe):
+            raise ValueError("bad input")
+
+        with self.assertRaises(ValueError):
+            broken(pd.DataFrame({'a': [1]}))
+        self.assertEqual(get_records()[-1]["status"], "error: ValueError")
+        self.assertEqual(get_records()[-1]["rows_in"], 1)
+
+    def test_records_since_and_frame(self):
+        enable_profiling(log_path=self.log_path)
+        with stage("first"):
+            pass
+        started = time.time()
+        with stage("second") as record:
+            record["rows_out"] = 5
+        frame = timings_frame(get_records(since=started))
+        self.assertEqual(frame["stage"].tolist(), ["second"])
+        self.assertEqual(frame["rows_out"].tolist(), [5])
+        self.assertTrue(timings_frame([]).empty)
+
+    def test_records_are_bounded(self):
+        enable_profiling(log_path=self.log_path)
+        for _ in range(pipeline_profiler.MAX_RECORDS + 10):
+            with stage("tiny"):
+                pass
+        self.assertEqual(len(get_records()), pipeline_profiler.MAX_RECORDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+import refresh_service
+
+
+class TestRefreshService(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.workdir, "published")
+        self.plot_cache_dir = os.path.join(self.workdir, "plots")
+        self.csv_path = os.path.join(self.workdir, "fires.csv")
+        pd.DataFrame({
+            'latitude': [34.0, 34.1, 36.0, 36.1, 35.0],
+            'longitude': [-119.0, -119.1, -121.0, -121.1, -120.0],
+            'brightness': [300, 450, 150, 320, 280],
+            'frp': [10, 15, 12.5, 9, 11],
+        }).to_csv(self.csv_path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_refresh_once_publishes_all_artifacts(self):
+        manifest = refresh_service.refresh_once(self.csv_path, output_dir=self.output_dir, clusters=2,
+                                                plot_cache_dir=self.plot_cache_dir)
+        self.assertEqual(refresh_service.read_manifest(self.output_dir), manifest)
+        for name in ("geojson", "plot", "cluster_stats"):
+            self.assertTrue(os.path.exists(refresh_service.published_path(manifest, name, self.output_dir)))
+        geo_df, cluster_stats, loaded = refresh_service.load_published(self.output_dir)
+        self.assertEqual(len(geo_df), 5)
+        self.assertEqual(len(cluster_stats), 2)
+        self.assertEqual(loaded["rows"], 5)
+
+    def test_url_source_reports_geojson_export(self):
+        manifest = refresh_service.refresh_once(Path(self.csv_path).as_uri(), output_dir=self.output_dir, clusters=2,
+                                                plot_cache_dir=self.plot_cache_dir)
+        self.assertEqual(set(manifest["exports"]), {"geojson", "geoparquet"})
+        geojson_path = refresh_service.published_path(manifest, "geojson", self.output_dir)
+        self.assertEqual(manifest["exports"]["geojson"]["bytes"], os.path.getsize(geojson_path))
+
+    def test_grid_is_read_once_per_version(self):
+        manifest = refresh_service.refresh_once(self.csv_path, output_dir=self.output_dir, clusters=2,
+                                                plot_cache_dir=self.plot_cache_dir)
+        grid = refresh_service.load_published_grid(manifest, self.output_dir)
+        with mock.patch("pandas.read_parquet") as read_parquet:
+            self.assertIs(refresh_service.load_published_grid(manifest, self.output_dir), grid)
+            read_parquet.assert_not_called()
+        newer = refresh_service.refresh_once(self.csv_path, output_dir=self.output_dir, clusters=2,
+                                             plot_cache_dir=self.plot_cache_dir)
+        self.assertIsNot(refresh_service.load_published_grid(newer, self.output_dir), grid)
+
+    def test_failed_refresh_keeps_previous_version(self):
+        first = refresh_service.refresh_once(self.csv_path, output_dir=self.output_dir, clusters=2,
+                                             plot_cache_dir=self.plot_cache_dir)
+        with mock.patch("backend_processing.main_wf", side_effect=RuntimeError("boom")):
+            self.assertIsNone(refresh_service.refresh_once(self.csv_path, output_dir=self.output_dir, clusters=2,
+                                                           plot_cache_dir=self.plot_cache_dir))
+        self.assertEqual(refresh_service.read_manifest(self.output_dir), first)
+        self.assertFalse([name for name in os.listdir(self.output_dir) if name.startswith(".staging")])
+
+    def test_old_versions_are_pruned(self):
+        for _ in range(4):
+            manifest = refresh_service.refresh_once(self.csv_path, output_dir=self.output_dir, clusters=2, keep_versions=2,
+                                                    plot_cache_dir=self.plot_cache_dir)
+        versions = [name for name in os.listdir(self.output_dir) if os.path.isdir(os.path.join(self.output_dir, name))]
+        self.assertEqual(len(versions), 2)
+        self.assertIn(manifest["version"], versions)
+
+    def test_background_service_stops(self):
+        thread, stop_event = refresh_service.start_refresh_service(self.csv_path, interval=60, output_dir=self.output_dir,
+                                                                   clusters=2, plot_cache_dir=self.plot_cache_dir)
+        for _ in range(100):
+            if refresh_service.read_manifest(self.output_dir):
+                break
+            thread.join(0.1)
+        stop_event.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNotNone(refresh_service.read_manifest(self.output_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+import result_cache
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.workdir, "cache")
+        self.csv_path = os.path.join(self.workdir, "fires.csv")
+        pd.DataFrame({
+            'latitude': [34.0, 34.1, 36.0, 36.1],
+            'longitude': [-119.0, -119.1, -121.0, -121.1],
+            'brightness': [300, 450, 150, 320],
+            'frp': [10, 15, 12.5, 9],
+        }).to_csv(self.csv_path, index=False)
+        result_cache.invalidate_cache(cache_dir=self.cache_dir)
+        self.old_cwd = os.getcwd()
+        os.chdir(self.workdir)
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        result_cache.invalidate_cache(cache_dir=self.cache_dir)
+        shutil.rmtree(self.workdir)
+
+    def test_cache_key_depends_on_params(self):
+        fingerprint = result_cache.file_fingerprint(self.csv_path)
+        self.assertEqual(result_cache.cache_key(fingerprint, clusters=2), result_cache.cache_key(fingerprint, clusters=2))
+        self.assertNotEqual(result_cache.cache_key(fingerprint, clusters=2), result_cache.cache_key(fingerprint, clusters=3))
+
+    def test_cached_main_wf_fits_once(self):
+        with mock.patch("backend_processing.run_model", wraps=result_cache.backend_processing.run_model) as run_model:
+            first = result_cache.cached_main_wf(self.csv_path, clusters=2, cache_dir=self.cache_dir)
+            first[0]['brightness'] = 0  # callers mutating the result must not corrupt the cache
+            second = result_cache.cached_main_wf(self.csv_path, clusters=2, cache_dir=self.cache_dir)
+            self.assertEqual(run_model.call_count, 1)
+        self.assertEqual(list(second[0]['brightness']), [300, 450, 150, 320])
+
+        # the disk level survives an in-process reset
+        result_cache._memory_cache.clear()
+        with mock.patch("backend_processing.run_model") as run_model:
+            third = result_cache.cached_main_wf(self.csv_path, clusters=2, cache_dir=self.cache_dir)
+            run_model.assert_not_called()
+        self.assertEqual(third[2], second[2])
+
+    def test_uncopied_hit_returns_cached_frames(self):
+        result_cache.cached_main_wf(self.csv_path, clusters=2, cache_dir=self.cache_dir)
+        first = result_cache.cached_main_wf(self.csv_path, clusters=2, cache_dir=self.cache_dir, copy=False)
+        second = result_cache.cached_main_wf(self.csv_path, clusters=2, cache_dir=self.cache_dir, copy=False)
+        self.assertIs(first[0], second[0])
+        self.assertIsNot(result_cache.cached_main_wf(self.csv_path, clusters=2, cache_dir=self.cache_dir)[0], first[0])
+
+    def test_hit_rewrites_the_plot_of_its_input(self):
+        other_path = os.path.join(self.workdir, "other.csv")
+        pd.DataFrame({
+            'latitude': [40.0, 40.1, 42.0, 42.1],
+            'longitude': [-100.0, -100.1, -102.0, -102.1],
+            'brightness': [310, 330, 480, 490],
+            'frp': [30, 35, 80, 90],
+        }).to_csv(other_path, index=False)
+        result_cache.cached_main_wf(self.csv_path, clusters=2, cache_dir=self.cache_dir)
+        with open("wildfire_summary_plot.png", "rb") as handle:
+            expected = handle.read()
+        result_cache.cached_main_wf(other_path, clusters=2, cache_dir=self.cache_dir)
+        result_cache.cached_main_wf(self.csv_path, clusters=2, cache_dir=self.cache_dir)
+        with open("wildfire_summary_plot.png", "rb") as handle:
+            self.assertEqual(handle.read(), expected)
+
+    def test_changed_file_misses(self):
+        result_cache.cached_main_wf(self.csv_path, clusters=2, cache_dir=self.cache_dir)
+        with open(self.csv_path, "a") as handle:
+            handle.write("37.0,-122.0,410,20\n")
+        result = result_cache.cached_main_wf(self.csv_path, clusters=2, cache_dir=self.cache_dir)
+        self.assertEqual(len(result[0]), 5)
+
+    def test_disk_eviction(self):
+        for i in range(3):
+            result_cache.put_cached(f"key{i}", (pd.DataFrame({'a': range(1000)}),), self.cache_dir, max_disk_bytes=20000)
+        remaining = os.listdir(self.cache_dir)
+        self.assertIn("key2.pkl", remaining)
+        self.assertNotIn("key0.pkl", remaining)
+
+    def test_memory_level_is_bounded_by_size(self):
+        frame = pd.DataFrame({'a': range(1000)}) # 8 kB of values
+        for i in range(3):
+            result_cache._remember(f"key{i}", (frame,), max_bytes=20000)
+        self.assertEqual(list(result_cache._memory_cache), ["key1", "key2"])
+        # an entry over the budget on its own is still kept, alone
+        result_cache._remember("big", (pd.DataFrame({'a': range(10000)}),), max_bytes=20000)
+        self.assertEqual(list(result_cache._memory_cache), ["big"])
+
+    def test_url_hit_rewrites_the_geojson_of_its_input(self):
+        other_path = os.path.join(self.workdir, "other.csv")
+        pd.read_csv(self.csv_path).assign(brightness=500).to_csv(other_path, index=False)
+        output = os.path.join(self.workdir, "out.json")
+        first_url, other_url = Path(self.csv_path).as_uri(), Path(other_path).as_uri()
+        result_cache.cached_auto_update_and_train(first_url, clusters=2, output_geojson=output, fingerprint="a",
+                                                  cache_dir=self.cache_dir)
+        with open(output) as handle:
+            expected = handle.read()
+        result_cache.cached_auto_update_and_train(other_url, clusters=2, output_geojson=output, fingerprint="b",
+                                                  cache_dir=self.cache_dir)
+        with mock.patch("backend_processing.auto_update_and_train") as run:
+            result_cache.cached_auto_update_and_train(first_url, clusters=2, output_geojson=output, fingerprint="a",
+                                                      cache_dir=self.cache_dir)
+            run.assert_not_called()
+        with open(output) as handle:
+            self.assertEqual(handle.read(), expected)
+
+    def test_invalidate_single_key(self):
+        result_cache.put_cached("key", (1, 2), self.cache_dir)
+        result_cache.invalidate_cache("key", cache_dir=self.cache_dir)
+        self.assertIsNone(result_cache.get_cached("key", self.cache_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
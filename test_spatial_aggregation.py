@@ -0,0 +1,41 @@
+import unittest
+
+import pandas as pd
+
+from spatial_aggregation import aggregate_grid, build_grid_pyramid, choose_resolution, pyramid_level, add_cell_colors
+
+
+class TestSpatialAggregation(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({
+            'latitude': [34.01, 34.02, 34.03, 40.6],
+            'longitude': [-119.01, -119.02, -119.03, -100.6],
+            'brightness': [300, 450, 250, 150],
+            'frp': [10, 20, 30, 5],
+            'risk_label': ["Medium Risk", "High Risk", "Medium Risk", "Low Risk"],
+        })
+
+    def test_cell_statistics(self):
+        cells = aggregate_grid(self.data, resolution=0.5).sort_values('latitude').reset_index(drop=True)
+        self.assertEqual(cells['count'].tolist(), [3, 1])
+        self.assertEqual(cells['max_brightness'].tolist(), [450, 150])
+        self.assertEqual(cells['mean_frp'].tolist(), [20, 5])
+        self.assertEqual(list(cells['risk_label']), ["Medium Risk", "Low Risk"])
+        self.assertAlmostEqual(cells['latitude'][0], 34.25)
+        self.assertAlmostEqual(cells['longitude'][0], -119.25)
+
+    def test_pyramid_levels_and_budget(self):
+        pyramid = build_grid_pyramid(self.data, resolutions=(0.01, 0.5))
+        self.assertEqual(pyramid.groupby('resolution')['count'].sum().tolist(), [4, 4])
+        self.assertEqual(pyramid_level(pyramid, max_cells=2).attrs['resolution'], 0.5)
+        self.assertEqual(pyramid_level(pyramid, max_cells=10).attrs['resolution'], 0.01)
+        self.assertEqual(choose_resolution(self.data, max_cells=2, resolutions=(0.01, 0.5)), 0.5)
+
+    def test_cell_colors(self):
+        cells = add_cell_colors(aggregate_grid(self.data, resolution=0.5))
+        self.assertTrue(all(len(color) == 4 for color in cells['color']))
+        self.assertEqual(len({tuple(color) for color in cells['color']}), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import summary_plot
+from summary_plot import clear_plot_cache, density_counts, evict_plot_cache, render_summary_plot
+
+
+class TestSummaryPlot(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, "plots")
+        rng = np.random.default_rng(11)
+        n = 5000
+        self.brightness = rng.uniform(290, 500, n)
+        self.frp = rng.lognormal(2, 1, n)
+        self.labels = pd.Series(rng.choice(["Low Risk", "Medium Risk", "High Risk"], n))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def output(self, name="plot.png"):
+        return os.path.join(self.temp_dir, name)
+
+    def test_density_counts_match_histogram(self):
+        categorical = pd.Categorical(self.labels)
+        counts, x_edges, y_edges = density_counts(self.brightness, self.frp, categorical.codes, 3, bins=(20, 10))
+        self.assertEqual(counts.shape, (3, 20, 10))
+        self.assertEqual(counts.sum(), len(self.brightness))
+        for code in range(3):
+            mask = categorical.codes == code
+            expected, _, _ = np.histogram2d(self.brightness[mask], np.log10(self.frp[mask]), bins=[x_edges, y_edges])
+            np.testing.assert_array_equal(counts[code], expected)
+
+    def test_invalid_rows_are_left_out(self):
+        codes = np.array([0, 0, -1, 0], dtype=np.int8)
+        counts, _, _ = density_counts([300, np.nan, 310, 320], [5, 5, 5, 0], codes, 1, bins=(4, 4))
+        self.assertEqual(counts.sum(), 1)
+
+    def test_auto_mode_switches_on_threshold(self):
+        with mock.patch.object(summary_plot, "render_density") as density, \
+                mock.patch.object(summary_plot, "render_scatter") as scatter:
+            render_summary_plot(self.brightness, self.frp, self.labels, self.output(), density_threshold=10000, cache_dir=None)
+            render_summary_plot(self.brightness, self.frp, self.labels, self.output(), density_threshold=1000, cache_dir=None)
+        self.assertEqual(scatter.call_count, 1)
+        self.assertEqual(density.call_count, 1)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            render_summary_plot(self.brightness, self.frp, self.labels, self.output(), mode="hexbin", cache_dir=None)
+
+    def test_cached_plot_is_not_redrawn(self):
+        first, digest = render_summary_plot(self.brightness, self.frp, self.labels, self.output("a.png"),
+                                            mode="density", cache_dir=self.cache_dir)
+        self.assertTrue(os.path.exists(first))
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir, digest + ".png")))
+        with mock.patch.object(summary_plot, "render_density") as density:
+            second, same = render_summary_plot(self.brightness, self.frp, self.labels, self.output("b.png"),
+                                               mode="density", cache_dir=self.cache_dir)
+        density.assert_not_called()
+        self.assertEqual(same, digest)
+        with open(first, "rb") as a, open(second, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_changed_data_is_redrawn(self):
+        _, digest = render_summary_plot(self.brightness, self.frp, self.labels, self.output(),
+                                        mode="scatter", cache_dir=self.cache_dir)
+        frp = self.frp.copy()
+        frp[0] += 1
+        _, changed = render_summary_plot(self.brightness, frp, self.labels, self.output(),
+                                         mode="scatter", cache_dir=self.cache_dir)
+        self.assertNotEqual(digest, changed)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_cache_evicts_least_recently_used(self):
+        paths = []
+        for i in range(3):
+            frp = self.frp * (i + 1)
+            _, digest = render_summary_plot(self.brightness, frp, self.labels, self.output(), mode="density",
+                                            cache_dir=self.cache_dir)
+            paths.append(os.path.join(self.cache_dir, digest + ".png"))
+            os.utime(paths[-1], (i, i))
+        size = os.path.getsize(paths[0])
+        # a hit marks the oldest as recently used, so the second one goes first
+        render_summary_plot(self.brightness, self.frp, self.labels, self.output(), mode="density", cache_dir=self.cache_dir)
+        evict_plot_cache(self.cache_dir, max_bytes=2 * size + size // 2)
+        self.assertEqual([os.path.exists(path) for path in paths], [True, False, True])
+        clear_plot_cache(self.cache_dir)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_invalidate_cache_clears_plots(self):
+        import result_cache
+        cache_dir = os.path.join(self.temp_dir, "results")
+        render_summary_plot(self.brightness, self.frp, self.labels, self.output(),
+                            cache_dir=os.path.join(cache_dir, summary_plot.PLOT_SUBDIR))
+        result_cache.invalidate_cache(cache_dir=cache_dir)
+        self.assertEqual(os.listdir(os.path.join(cache_dir, summary_plot.PLOT_SUBDIR)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from synthetic_modis import MODIS_COLUMNS, generate_modis, write_modis_csv
+
+
+class TestSyntheticModis(unittest.TestCase):
+    def test_same_seed_same_rows(self):
+        pd.testing.assert_frame_equal(generate_modis(500, seed=3), generate_modis(500, seed=3))
+        self.assertFalse(generate_modis(500, seed=3).equals(generate_modis(500, seed=4)))
+
+    def test_schema_and_ranges(self):
+        df = generate_modis(5000, seed=1, n_days=3)
+        self.assertEqual(list(df.columns), MODIS_COLUMNS)
+        self.assertTrue(df['latitude'].between(15, 52).all())
+        self.assertTrue(df['longitude'].between(-165, -60).all())
+        self.assertTrue(df['confidence'].between(0, 100).all())
+        self.assertEqual(set(df['daynight']), {'D', 'N'})
+        self.assertEqual(df['acq_date'].nunique(), 3)
+        # day detections are hotter on average, frp follows brightness
+        self.assertGreater(df.loc[df['daynight'] == 'D', 'brightness'].mean(),
+                           df.loc[df['daynight'] == 'N', 'brightness'].mean())
+        self.assertGreater(df['brightness'].corr(df['frp'], method='spearman'), 0.5)
+
+    def test_detections_are_spatially_clustered(self):
+        df = generate_modis(5000, seed=2, n_hotspots=10)
+        cells = (df['latitude'].round(0).astype(str) + df['longitude'].round(0).astype(str)).nunique()
+        self.assertLess(cells, 200)
+
+    def test_chunked_csv_matches_requested_size(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = write_modis_csv(os.path.join(temp_dir, "modis.csv"), 2500, seed=5, chunk_rows=1000)
+            df = pd.read_csv(path, dtype={'acq_time': str})
+            self.assertEqual(len(df), 2500)
+            self.assertEqual(list(df.columns), MODIS_COLUMNS)
+            self.assertTrue((df['acq_time'].str.len() == 4).all())
+            again = pd.read_csv(write_modis_csv(os.path.join(temp_dir, "again.csv"), 2500, seed=5, chunk_rows=1000),
+                                dtype={'acq_time': str})
+            pd.testing.assert_frame_equal(df, again)
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from unittest import mock
+
+import backend_processing
+from backend_processing import auto_update_and_train
+from url_ingest import stream_csv_chunks, read_csv_url
+
+CSV_TEXT = "latitude,longitude,brightness,frp\n" + "".join(
+    f"{34 + (i % 2) * 10 + i * 0.001},{-119 - (i % 2) * 10},{200 + i},{1 + i % 7}\n" for i in range(40))
+
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    failures_left = 0
+
+    def do_GET(self):
+        if _FeedHandler.failures_left > 0:
+            _FeedHandler.failures_left -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = gzip.compress(CSV_TEXT.encode()) if self.path.endswith(".gz") else CSV_TEXT.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestUrlIngest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), _FeedHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_file_url_chunks(self):
+        path = Path(self.workdir) / "feed.csv"
+        path.write_text(CSV_TEXT)
+        chunks = list(stream_csv_chunks(path.as_uri(), chunksize=15))
+        self.assertEqual([len(chunk) for chunk in chunks], [15, 15, 10])
+
+    def test_gzip_file_url(self):
+        path = Path(self.workdir) / "feed.csv.gz"
+        path.write_bytes(gzip.compress(CSV_TEXT.encode()))
+        self.assertEqual(len(read_csv_url(path.as_uri())), 40)
+
+    def test_http_gzip_with_retry(self):
+        _FeedHandler.failures_left = 2
+        df = read_csv_url(self.base_url + "/feed.csv.gz", chunksize=7, backoff=0.01)
+        self.assertEqual(len(df), 40)
+        self.assertEqual(_FeedHandler.failures_left, 0)
+
+    def test_http_gives_up_after_retries(self):
+        _FeedHandler.failures_left = 5
+        with self.assertRaises(Exception):
+            read_csv_url(self.base_url + "/feed.csv", retries=1, backoff=0.01)
+        _FeedHandler.failures_left = 0
+
+    def test_auto_update_and_train_from_local_server(self):
+        output = os.path.join(self.workdir, "out.json")
+        geo_df, model, score, stats = auto_update_and_train(self.base_url + "/feed.csv", clusters=2, output_geojson=output)
+        self.assertEqual(len(geo_df), 40)
+        self.assertEqual(len(stats), 2)
+        self.assertTrue(os.path.exists(output))
+
+        spooled, spool_chunks = [], backend_processing.spool_chunks
+
+        def spool(chunks):
+            spooled.append(spool_chunks(chunks))
+            return spooled[-1]
+
+        with mock.patch("backend_processing.spool_chunks", side_effect=spool):
+            geo_df, model, score, stats = auto_update_and_train(self.base_url + "/feed.csv", clusters=2,
+                                                                output_geojson=output, chunksize=9)
+        self.assertEqual(len(geo_df), 40)
+        # the chunked run re-read a temporary spool of the download, removed afterwards
+        self.assertEqual(len(spooled), 1)
+        self.assertFalse(os.path.exists(spooled[0]))
+
+    def test_auto_update_and_train_failure(self):
+        result = auto_update_and_train(Path(self.workdir, "missing.csv").as_uri())
+        self.assertEqual(result, (None, None, None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
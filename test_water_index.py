@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import result_cache
+from backend_processing import EARTH_RADIUS_KM, load_water_resources
+from water_index import (add_nearest_water, build_water_index, count_water_within, load_water_index,
+                         nearest_water, water_within)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class TestWaterIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        self.sites = pd.DataFrame({
+            'name': [f"Site {i % 50}" for i in range(3000)],
+            'latitude': rng.uniform(25, 49, 3000),
+            'longitude': rng.uniform(-124, -67, 3000),
+        })
+        self.fires = pd.DataFrame({'latitude': rng.uniform(25, 49, 500), 'longitude': rng.uniform(-124, -67, 500)})
+        self.index = build_water_index(self.sites)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        result_cache.invalidate_cache(cache_dir=os.path.join(self.temp_dir, "cache"))
+        shutil.rmtree(self.temp_dir)
+
+    def brute_force(self):
+        distances = haversine_km(self.fires['latitude'].to_numpy()[:, None], self.fires['longitude'].to_numpy()[:, None],
+                                 self.sites['latitude'].to_numpy()[None, :], self.sites['longitude'].to_numpy()[None, :])
+        return distances
+
+    def test_nearest_matches_brute_force_haversine(self):
+        distances = self.brute_force()
+        distance_km, rows = nearest_water(self.fires['latitude'], self.fires['longitude'], self.index)
+        np.testing.assert_array_equal(rows, distances.argmin(axis=1))
+        np.testing.assert_allclose(distance_km, distances.min(axis=1), rtol=1e-6)
+
+    def test_add_nearest_water_columns(self):
+        result = add_nearest_water(self.fires.copy(), self.index)
+        rows = self.brute_force().argmin(axis=1)
+        self.assertEqual(result['nearest_water_km'].dtype, np.float32)
+        self.assertEqual(result['nearest_water_name'].tolist(), self.sites['name'].to_numpy()[rows].tolist())
+
+    def test_max_km_leaves_far_points_empty(self):
+        result = add_nearest_water(self.fires.copy(), self.index, max_km=5)
+        far = self.brute_force().min(axis=1) > 5
+        self.assertTrue(far.any())
+        self.assertTrue(result.loc[far, 'nearest_water_km'].isna().all())
+        self.assertTrue(result.loc[far, 'nearest_water_name'].isna().all())
+        self.assertTrue(result.loc[~far, 'nearest_water_name'].notna().all())
+
+    def test_radius_queries(self):
+        distances = self.brute_force()
+        counts = count_water_within(self.fires['latitude'], self.fires['longitude'], self.index, 50)
+        np.testing.assert_array_equal(counts, (distances <= 50).sum(axis=1))
+
+        fire = self.fires.iloc[0]
+        found = water_within(fire['latitude'], fire['longitude'], self.index, 80)
+        self.assertEqual(sorted(found.index), sorted(np.flatnonzero(distances[0] <= 80)))
+        self.assertTrue(found['distance_km'].is_monotonic_increasing)
+        self.assertTrue((found['distance_km'] <= 80).all())
+
+    def test_empty_inputs(self):
+        empty = build_water_index(self.sites.iloc[:0])
+        distance_km, rows = nearest_water(self.fires['latitude'], self.fires['longitude'], empty)
+        self.assertTrue(np.isnan(distance_km).all())
+        self.assertTrue((rows == -1).all())
+        self.assertEqual(len(nearest_water([], [], self.index)[0]), 0)
+
+    def test_load_keeps_every_site_and_caches_index(self):
+        path = os.path.join(self.temp_dir, "water.csv")
+        self.sites.assign(kind="lake").to_csv(path, index=False)
+        self.assertEqual(len(load_water_resources(path)), len(self.sites)) # no 2000 site cap
+        cache_dir = os.path.join(self.temp_dir, "cache")
+        tree, sites = load_water_index(path, cache_dir=cache_dir)
+        self.assertEqual(tree.n, len(self.sites))
+        result_cache._memory_cache.clear()
+        cached_tree, cached_sites = load_water_index(path, cache_dir=cache_dir)  # from disk
+        np.testing.assert_array_equal(cached_tree.data, tree.data)
+        pd.testing.assert_frame_equal(cached_sites, sites)
+
+
+if __name__ == "__main__":
+    unittest.main()
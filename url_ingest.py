@@ -0,0 +1,88 @@
+import io
+import gzip
+import time
+from urllib.parse import urlparse, unquote
+from urllib.request import url2pathname
+
+import pandas as pd
+import requests
+
+"""
+url_ingest.py
+
+Description:
+    Streams CSV feeds (e.g. the FIRMS MODIS NRT files) straight from an HTTP(S)
+    or file:// URL into pandas' chunked CSV parser, so memory stays bounded by
+    the chunk size instead of holding the whole body as bytes, a string and a
+    StringIO copy. Gzip bodies are detected from their magic bytes and
+    decompressed on the fly.
+"""
+
+GZIP_MAGIC = b"\x1f\x8b"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def open_url_stream(url, timeout=(5, 60), retries=3, backoff=1.0, headers=None):
+    """
+    Opens url for streaming and returns (binary file object, response).
+    response is None for file:// URLs and plain local paths.
+    Connection errors, timeouts and 429/5xx answers are retried with exponential
+    backoff (backoff, 2*backoff, 4*backoff, ... seconds) before the error is raised.
+    timeout: (connect, read) seconds passed to requests; the read timeout applies to
+        each socket read, so long downloads are fine as long as data keeps arriving.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme in ("", "file"):
+        path = url2pathname(unquote(parsed.path)) if parsed.scheme == "file" else url
+        return _maybe_gunzip(io.BufferedReader(io.FileIO(path, "rb"))), None
+
+    for attempt in range(retries + 1):
+        try:
+            response = requests.get(url, stream=True, timeout=timeout, headers=headers)
+            if response.status_code in RETRY_STATUS and attempt < retries:
+                response.close()
+                raise requests.HTTPError(f"{response.status_code} from {url}", response=response)
+            response.raise_for_status()
+            break
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            retryable = not isinstance(e, requests.HTTPError) or e.response is None or e.response.status_code in RETRY_STATUS
+            if attempt >= retries or not retryable:
+                raise
+            wait = backoff * 2 ** attempt
+            print(f"Download attempt {attempt + 1} failed ({e}), retrying in {wait:.1f}s")
+            time.sleep(wait)
+
+    # Content-Encoding: gzip is undone by urllib3, a .gz body is caught by _maybe_gunzip
+    response.raw.decode_content = True
+    response.raw.auto_close = False # let the buffered reader see EOF instead of a closed file
+    return _maybe_gunzip(io.BufferedReader(response.raw)), response
+
+def _maybe_gunzip(stream):
+    if stream.peek(2)[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    return stream
+
+def stream_csv_chunks(url, chunksize=100000, timeout=(5, 60), retries=3, backoff=1.0, headers=None, **read_csv_kwargs):
+    """
+    Yields dataframes of at most chunksize rows parsed directly from the URL stream.
+    Only the current chunk (plus the parser's read buffer) is held in memory.
+    """
+    stream, response = open_url_stream(url, timeout=timeout, retries=retries, backoff=backoff, headers=headers)
+    try:
+        with pd.read_csv(stream, chunksize=chunksize, **read_csv_kwargs) as reader:
+            for chunk in reader:
+                yield chunk
+    finally:
+        stream.close()
+        if response is not None:
+            response.close()
+
+def read_csv_url(url, chunksize=100000, **kwargs):
+    """
+    Reads the whole feed into one dataframe through stream_csv_chunks, so the peak is
+    about the size of the parsed frame rather than three copies of the payload.
+    """
+    chunks = list(stream_csv_chunks(url, chunksize=chunksize, **kwargs))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from backend_processing import EARTH_RADIUS_KM, load_water_resources
+from pipeline_profiler import profile_stage
+from result_cache import CACHE_DIR, cache_key, file_fingerprint, get_cached, put_cached
+
+"""
+water_index.py
+
+Description:
+    Nearest water resource lookups for every detection. Water sites are
+    indexed once in a KD-tree over unit vectors on the sphere: the straight
+    line (chord) distance between two unit vectors grows monotonically with
+    the great-circle distance, so nearest-neighbour and radius queries on
+    the tree give exactly the haversine answer, at KD-tree speed and with
+    the queries spread over all cores. The index is cached on the contents
+    of the water file (see result_cache.py), so it is built once per file.
+"""
+
+WATER_INDEX_VERSION = 1 # bump when the cached index layout changes
+
+
+def to_unit_vectors(latitudes, longitudes):
+    latitudes = np.radians(np.asarray(latitudes, dtype=float))
+    longitudes = np.radians(np.asarray(longitudes, dtype=float))
+    cos_lat = np.cos(latitudes)
+    return np.column_stack([cos_lat * np.cos(longitudes), cos_lat * np.sin(longitudes), np.sin(latitudes)])
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+def km_to_chord(km):
+    return 2 * np.sin(np.minimum(np.asarray(km, dtype=float) / EARTH_RADIUS_KM, np.pi) / 2)
+
+@profile_stage()
+def build_water_index(water_df):
+    """
+    Indexes every site of water_df (name, latitude, longitude).
+    Returns (tree, sites) where sites is water_df with a 0..n-1 index matching the tree.
+    """
+    sites = water_df[['name', 'latitude', 'longitude']].dropna().reset_index(drop=True)
+    sites['name'] = sites['name'].astype('category') # names repeat a lot (e.g. "Reservoir"), keep one copy
+    tree = cKDTree(to_unit_vectors(sites['latitude'], sites['longitude']))
+    return tree, sites
+
+def load_water_index(filepath, cache_dir=CACHE_DIR):
+    """
+    build_water_index over the whole file at filepath, cached on the file contents.
+    """
+    key = cache_key(file_fingerprint(filepath), fn="water_index", version=WATER_INDEX_VERSION)
+    cached = get_cached(key, cache_dir)
+    if cached is not None:
+        return cached
+    index = build_water_index(load_water_resources(filepath))
+    put_cached(key, index, cache_dir)
+    return index
+
+@profile_stage()
+def nearest_water(latitudes, longitudes, water_index, max_km=None, workers=-1):
+    """
+    Distance (km) and row of the closest water site for every point.
+    Points with no site within max_km get distance NaN and row -1.
+    workers: threads used for the queries (-1 = all cores).
+    """
+    tree, sites = water_index
+    if len(sites) == 0 or len(latitudes) == 0:
+        return np.full(len(latitudes), np.nan), np.full(len(latitudes), -1, dtype=np.int64)
+    upper = km_to_chord(max_km) if max_km is not None else np.inf
+    chord, rows = tree.query(to_unit_vectors(latitudes, longitudes), k=1, distance_upper_bound=upper, workers=workers)
+    found = np.isfinite(chord)
+    distance_km = np.where(found, chord_to_km(np.where(found, chord, 0)), np.nan)
+    return distance_km, np.where(found, rows, -1).astype(np.int64)
+
+def add_nearest_water(dataframe, water_index, max_km=None):
+    """
+    Adds nearest_water_km (float32) and nearest_water_name (categorical) to dataframe.
+    """
+    _, sites = water_index
+    distance_km, rows = nearest_water(dataframe['latitude'].to_numpy(), dataframe['longitude'].to_numpy(),
+                                      water_index, max_km=max_km)
+    names = sites['name'].cat.codes.to_numpy()[np.maximum(rows, 0)] if len(sites) else np.zeros(len(rows), dtype=np.int8)
+    dataframe['nearest_water_km'] = distance_km.round(2).astype(np.float32)
+    dataframe['nearest_water_name'] = pd.Categorical.from_codes(np.where(rows >= 0, names, -1),
+                                                                dtype=sites['name'].dtype)
+    return dataframe
+
+def water_within(latitude, longitude, water_index, radius_km):
+    """
+    All water sites within radius_km of one location, closest first, with a distance_km column.
+    """
+    tree, sites = water_index
+    rows = np.asarray(tree.query_ball_point(to_unit_vectors([latitude], [longitude])[0], km_to_chord(radius_km)),
+                      dtype=np.int64)
+    found = sites.iloc[rows].copy()
+    found['distance_km'] = chord_to_km(np.linalg.norm(tree.data[rows] - to_unit_vectors([latitude], [longitude]), axis=1))
+    return found.sort_values('distance_km')
+
+@profile_stage()
+def count_water_within(latitudes, longitudes, water_index, radius_km, workers=-1):
+    """
+    Number of water sites within radius_km of every point, without materialising the matches.
+    """
+    tree, _ = water_index
+    if len(latitudes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return tree.query_ball_point(to_unit_vectors(latitudes, longitudes), km_to_chord(radius_km),
+                                 return_length=True, workers=workers)